@@ -6,7 +6,7 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=['questionary', 'colorama', 'ping3', 'plyer', 'psutil', 'pyperclip', 'qrcode', 'PIL', 'requests'],
+    hiddenimports=['questionary', 'colorama', 'ping3', 'plyer', 'psutil', 'pyperclip', 'qrcode', 'PIL', 'requests', 'tracemalloc', 'site'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
@@ -27,7 +27,9 @@ def build():
         "--hidden-import=pyperclip",
         "--hidden-import=qrcode",
         "--hidden-import=PIL",
-        "--hidden-import=requests"
+        "--hidden-import=requests",
+        "--hidden-import=tracemalloc",  # core/profiler.py (--profile-startup) 运行时才导入
+        "--hidden-import=site"  # core/deps.py 依赖检查指纹
     ]
 
     # 4. 执行 PyInstaller 命令
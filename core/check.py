@@ -1,10 +1,12 @@
-import importlib
+import importlib.util
 import os
 import sys
+from core import manifest
 
 __info__ = {
     "help": "系统自检：排查插件与核心组件的冲突与配置错误",
-    "alias": ["verify", "debug"]
+    "alias": ["verify", "debug"],
+    "deps": []
 }
 
 def setup_args(parser):
@@ -30,6 +32,7 @@ def run_check(args, tools):
 
     alias_map = {}
     errors = []
+    notes = []
     success_count = 0
 
     for label, folder_path in scan_targets.items():
@@ -45,19 +48,29 @@ def run_check(args, tools):
         for name in files:
             # 确定导入路径
             prefix = "core" if "CORE" in label else "mods"
-            import_path = f"{prefix}.{name}"
             
             try:
-                # 动态加载并强制刷新模块
-                mod = importlib.import_module(import_path)
-                importlib.reload(mod)
+                # 静态解析源码，不执行插件代码，也不会导入插件的重量级依赖
+                entry = manifest.extract_static(os.path.join(folder_path, f"{name}.py"), prefix, name)
+                if entry is None:
+                    # __info__ 不是字面量：与启动器一样回退为导入模块读取，继续检查别名等
+                    notes.append(f"[{label}] {name}: __info__ 不是字面量字典，启动时需导入模块 (较慢)")
+                    entry = manifest.describe_module(prefix, name)
+                    if entry.get("error"):
+                        errors.append(f"[{label}] {name}: {entry['error']}")
+                        continue
+
+                # 检查顶层导入的依赖是否可用
+                for lib in entry.get("imports", []):
+                    if lib not in ("core", "mods") and importlib.util.find_spec(lib) is None:
+                        errors.append(f"[{label}] {name}: 缺失依赖 {lib}")
 
                 # 1. 检查是否为“可运行”组件 (带有 __info__ 的)
-                if hasattr(mod, "__info__"):
-                    info = mod.__info__
+                if entry["info"] is not None:
+                    info = entry["info"]
                     
                     # 检查执行函数是否存在
-                    if not hasattr(mod, f"run_{name}"):
+                    if not entry["runnable"]:
                         errors.append(f"[{label}] {name}: 缺失函数 run_{name}")
                         continue
 
@@ -86,5 +99,7 @@ def run_check(args, tools):
         print(f"{Fore.RED}❌ 发现 {len(errors)} 个潜在问题:")
         for err in errors:
             print(f"  - {err}")
+    for note in notes:
+        print(f"{Fore.YELLOW}  提示: {note}")
     
     print("-" * 62)
\ No newline at end of file
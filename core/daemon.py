@@ -0,0 +1,402 @@
+import io
+import os
+import sys
+import json
+import stat
+import time
+import socket
+import struct
+import threading
+import hashlib
+import argparse
+import tempfile
+import importlib
+import traceback
+import subprocess
+from contextlib import redirect_stdout, redirect_stderr
+from core import manifest
+
+__info__ = {
+    "help": "常驻守护进程：预热插件与工具包，加速重复调用 (设置 CLI_KIT_DAEMON=1 启用转发)",
+    "alias": ["warm"],
+    "deps": []
+}
+
+# 这些命令始终在本地执行，不转发给守护进程
+DAEMON_COMMANDS = ("daemon", "warm")
+# 导入 (含函数内延迟导入) 或声明依赖这些交互库的插件需要真实终端，交由客户端本地执行
+INTERACTIVE_LIBS = ("questionary",)
+
+def setup_args(parser):
+    parser.add_argument("action", nargs="?", choices=["start", "stop", "status", "run"], default="status",
+                        help="start 后台启动 / run 前台运行 / stop 停止 / status 查看状态")
+
+def get_root_dir():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__ + "/../"))
+
+def is_supported():
+    return hasattr(socket, "AF_UNIX")
+
+def get_uid():
+    return os.getuid() if hasattr(os, "getuid") else 0
+
+def is_private_dir(path):
+    """目录必须是真实目录 (非符号链接)、属于当前用户且其他用户无任何权限"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return stat.S_ISDIR(st.st_mode) and st.st_uid == get_uid() and not st.st_mode & 0o077
+
+def get_socket_dir():
+    """
+    套接字所在的私有目录：优先 $XDG_RUNTIME_DIR/cli-kit，否则临时目录下的 cli-kit-<uid>。
+    目录以 0700 创建；已存在但属主或权限不符 (可能被其他用户抢先创建) 时返回 None。
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    base = runtime if runtime and is_private_dir(runtime) else tempfile.gettempdir()
+    path = os.path.join(base, "cli-kit" if base == runtime else f"cli-kit-{get_uid()}")
+    try:
+        os.mkdir(path, 0o700)
+    except FileExistsError:
+        pass
+    except OSError:
+        return None
+    return path if is_private_dir(path) else None
+
+def get_socket_path():
+    """每个安装目录、每个用户一个套接字；私有目录不可用时返回 None (禁用守护进程)"""
+    folder = get_socket_dir()
+    if folder is None:
+        return None
+    tag = hashlib.md5(get_root_dir().encode()).hexdigest()[:8]
+    return os.path.join(folder, f"{tag}.sock")
+
+def peer_uid(conn):
+    """通过 SO_PEERCRED 读取对端进程的 uid，平台不支持时返回 None"""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    creds = conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+    return struct.unpack("3i", creds)[1]
+
+def is_trusted_peer(conn):
+    uid = peer_uid(conn)
+    return uid is None or uid == get_uid()
+
+def _send(conn, msg):
+    conn.sendall((json.dumps(msg, ensure_ascii=False) + "\n").encode("utf-8"))
+
+def _connect(timeout=None):
+    """连接守护进程；套接字或对端进程不属于当前用户时拒绝连接，避免命令与输入泄露给他人"""
+    if not is_supported():
+        return None
+    path = get_socket_path()
+    try:
+        if path is None or os.stat(path).st_uid != get_uid():
+            return None
+    except OSError:
+        return None
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(path)
+        if is_trusted_peer(s):
+            return s
+    except OSError:
+        pass
+    s.close()
+    return None
+
+def _call(op, timeout=3):
+    """发送控制指令 (ping/stop)，守护进程不可达时返回 None"""
+    s = _connect(timeout)
+    if s is None:
+        return None
+    try:
+        with s, s.makefile("r", encoding="utf-8") as reader:
+            _send(s, {"op": op})
+            line = reader.readline()
+            return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+def forward(argv):
+    """
+    客户端：将命令转发给守护进程并回放其输出，返回退出码。
+    守护进程未运行、正忙或该插件需要本地执行 (交互式/长时间运行) 时返回 None，
+    由调用方按常规流程本地执行。
+    """
+    if not argv or argv[0] in DAEMON_COMMANDS or argv[0].startswith("-"):
+        return None
+    s = _connect()
+    if s is None:
+        return None
+
+    # 只转发管道/重定向文件的输入，避免在终端或字符设备上阻塞读取
+    stdin_data = ""
+    try:
+        mode = os.fstat(sys.stdin.fileno()).st_mode
+        if stat.S_ISFIFO(mode) or stat.S_ISREG(mode):
+            stdin_data = sys.stdin.read()
+    except (AttributeError, OSError, ValueError):
+        pass
+
+    with s, s.makefile("r", encoding="utf-8") as reader:
+        _send(s, {"op": "run", "argv": argv, "cwd": os.getcwd(), "stdin": stdin_data, "env": client_env()})
+        for line in reader:
+            msg = json.loads(line)
+            if msg.get("local"):
+                # 已读取的管道输入交还给本地执行
+                if stdin_data:
+                    sys.stdin = io.StringIO(stdin_data)
+                return None
+            if "exit" in msg:
+                return msg["exit"]
+            stream = sys.stderr if msg.get("stream") == "stderr" else sys.stdout
+            stream.write(msg["data"])
+            stream.flush()
+    return 1  # 守护进程中途断开
+
+def client_env():
+    """随请求转发的环境变量；跳过无法按 UTF-8 编码的项 (非法字节会被解码为代理字符)"""
+    env = {}
+    for key, value in os.environ.items():
+        try:
+            key.encode("utf-8"), value.encode("utf-8")
+        except UnicodeEncodeError:
+            continue
+        env[key] = value
+    return env
+
+class StreamWriter(io.TextIOBase):
+    """把插件的 print 输出实时转发给客户端"""
+    encoding = "utf-8"
+
+    def __init__(self, conn, name):
+        self.conn = conn
+        self.name = name
+
+    def write(self, data):
+        if data:
+            _send(self.conn, {"stream": self.name, "data": data})
+        return len(data)
+
+    def isatty(self):
+        return False
+
+class RunLocally(Exception):
+    """该命令应由客户端在本地执行"""
+
+def needs_terminal(entry):
+    """__info__ 声明 "daemon": False (交互式或长时间运行)，或导入/依赖交互库的插件"""
+    info = entry["info"]
+    if info.get("daemon") is False:
+        return True
+    libs = set(entry.get("imports", [])) | set(entry.get("lazy_imports", [])) | set(info.get("deps", []))
+    return any(lib in libs for lib in INTERACTIVE_LIBS)
+
+class WarmServer:
+    """
+    常驻进程：插件模块与工具包在多次调用之间保持加载状态。
+    每个连接在独立线程中处理；插件执行会改写 sys.stdout / 工作目录等进程级状态，
+    因此同一时刻只执行一个命令，其余命令请求被告知在本地执行，不会排队等待。
+    """
+
+    def __init__(self, root_dir, tools):
+        self.root_dir = root_dir
+        self.tools = tools
+        self.loaded = {}  # "mods.xxx" -> 导入时的文件 mtime
+        self.started = time.time()
+        self.served = 0
+        self.running = True
+        self.run_lock = threading.Lock()
+
+    def list_entities(self, kind):
+        folder = os.path.join(self.root_dir, kind)
+        if not os.path.isdir(folder):
+            return []
+        return [f[:-3] for f in os.listdir(folder) if f.endswith('.py') and not f.startswith('__')]
+
+    def build_parser(self):
+        """每次请求按清单缓存重建解析器 (不导入插件)，从而感知新增/修改的插件"""
+        parser = argparse.ArgumentParser(prog="cli-kit", description="CLI-Kit")
+        subparsers = parser.add_subparsers(dest="command")
+        core_entities, mod_entities = {}, {}
+        manifest.register_entities(subparsers, self.root_dir, 'core', self.list_entities('core'), core_entities)
+        manifest.register_entities(subparsers, self.root_dir, 'mods', self.list_entities('mods'), mod_entities)
+        return parser, {**mod_entities, **core_entities}
+
+    def load_module(self, entry):
+        """导入插件；文件在上次加载后被修改时自动 reload"""
+        key = f"{entry['kind']}.{entry['name']}"
+        mtime = os.stat(os.path.join(self.root_dir, entry['kind'], f"{entry['name']}.py")).st_mtime_ns
+        mod = importlib.import_module(key)
+        if key in self.loaded and self.loaded[key] != mtime:
+            mod = importlib.reload(mod)
+        self.loaded[key] = mtime
+        return mod
+
+    def dispatch(self, argv):
+        parser, entities = self.build_parser()
+        args = parser.parse_args(argv)
+        for name, entry in entities.items():
+            if args.command == name or args.command in entry["info"].get("alias", []):
+                if needs_terminal(entry):
+                    raise RunLocally()
+                deps = self.tools.get("deps")
+                if hasattr(deps, "get_plugin_libs"): deps.ensure_dependencies(deps.get_plugin_libs(entry["info"]))
+                getattr(self.load_module(entry), f"run_{name}")(args, self.tools)
+                break
+        return 0
+
+    def run_request(self, conn, msg):
+        """
+        以客户端的参数、工作目录、标准输入与环境变量执行命令，结束后恢复守护进程自身的状态。
+        插件在导入时读取的环境变量 (模块级常量) 仍是首次导入时的值。
+        """
+        argv = msg.get("argv", [])
+        saved = (sys.argv, sys.stdin, os.getcwd(), dict(os.environ))
+        sys.argv = ["cli-kit"] + argv
+        sys.stdin = io.StringIO(msg.get("stdin", ""))
+        if isinstance(msg.get("env"), dict):
+            os.environ.clear()
+            os.environ.update(msg["env"])
+        try:
+            os.chdir(msg.get("cwd") or saved[2])
+            with redirect_stdout(StreamWriter(conn, "stdout")), redirect_stderr(StreamWriter(conn, "stderr")):
+                try:
+                    return self.dispatch(argv)
+                except RunLocally:
+                    return None
+                except SystemExit as e:
+                    if e.code is None or isinstance(e.code, int):
+                        return e.code or 0
+                    print(e.code, file=sys.stderr)
+                    return 1
+                except KeyboardInterrupt:
+                    return 130
+                except Exception:
+                    traceback.print_exc()
+                    return 1
+        finally:
+            sys.argv, sys.stdin = saved[0], saved[1]
+            os.chdir(saved[2])
+            os.environ.clear()
+            os.environ.update(saved[3])
+
+    def handle(self, conn):
+        with conn, conn.makefile("r", encoding="utf-8") as reader:
+            line = reader.readline()
+            if not line:
+                return
+            msg = json.loads(line)
+            op = msg.get("op")
+            if op == "ping":
+                _send(conn, {"exit": 0, "pid": os.getpid(), "uptime": time.time() - self.started,
+                             "served": self.served, "loaded": sorted(self.loaded)})
+            elif op == "stop":
+                self.running = False
+                _send(conn, {"exit": 0})
+            elif op == "run":
+                if not self.run_lock.acquire(blocking=False):
+                    _send(conn, {"local": True})  # 正在执行其他命令
+                    return
+                try:
+                    code = self.run_request(conn, msg)
+                finally:
+                    self.run_lock.release()
+                if code is None:
+                    _send(conn, {"local": True})
+                    return
+                self.served += 1
+                _send(conn, {"exit": code})
+
+    def handle_safe(self, conn):
+        try:
+            self.handle(conn)
+        except (OSError, ValueError):
+            pass  # 客户端中途断开或发送了非法数据
+
+    def serve_forever(self, path):
+        srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        srv.bind(path)
+        os.chmod(path, 0o600)
+        srv.listen(16)
+        srv.settimeout(1.0)  # 定期检查 running，使 stop 指令能及时生效
+        try:
+            while self.running:
+                try:
+                    conn, _ = srv.accept()
+                except socket.timeout:
+                    continue
+                if not is_trusted_peer(conn):
+                    conn.close()  # 拒绝其他用户的进程
+                    continue
+                threading.Thread(target=self.handle_safe, args=(conn,), daemon=True).start()
+        finally:
+            srv.close()
+            try: os.remove(path)
+            except OSError: pass
+
+def spawn_background(root_dir):
+    """以独立会话启动 daemon run，脱离当前终端"""
+    if getattr(sys, 'frozen', False):
+        cmd = [sys.executable, "daemon", "run"]
+    else:
+        cmd = [sys.executable, os.path.join(root_dir, "main.py"), "daemon", "run"]
+    kwargs = {"start_new_session": True} if os.name != "nt" else {}
+    subprocess.Popen(cmd, cwd=root_dir, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, **kwargs)
+
+def run_daemon(args, tools):
+    Fore = tools["Fore"]
+    action = getattr(args, 'action', 'status') or 'status'
+
+    if not is_supported():
+        print(f"{Fore.RED}❌ 当前系统不支持 Unix 套接字，无法使用守护进程模式。")
+        return
+
+    path = get_socket_path()
+    if path is None:
+        print(f"{Fore.RED}❌ 无法创建私有的套接字目录 (可能已被其他用户占用)，守护进程模式已禁用。")
+        return
+    status = _call("ping")
+
+    if action == "status":
+        if status:
+            print(f"{Fore.GREEN}● 守护进程运行中 | PID {status['pid']} | 已运行 {status['uptime']:.0f}s | 已处理 {status['served']} 次调用")
+            print(f"  已预热插件: {', '.join(status['loaded']) or '无'}")
+            print(f"  套接字: {path}")
+        else:
+            print(f"{Fore.YELLOW}○ 守护进程未运行。使用 'daemon start' 启动，并设置 CLI_KIT_DAEMON=1 启用转发。")
+
+    elif action == "stop":
+        if status and _call("stop"):
+            print(f"{Fore.GREEN}✅ 守护进程已停止。")
+        else:
+            print(f"{Fore.YELLOW}守护进程未运行。")
+
+    elif action == "start":
+        if status:
+            print(f"{Fore.YELLOW}守护进程已在运行 (PID {status['pid']})。")
+            return
+        spawn_background(get_root_dir())
+        for _ in range(50):
+            time.sleep(0.1)
+            status = _call("ping")
+            if status:
+                print(f"{Fore.GREEN}✅ 守护进程已启动 (PID {status['pid']})。")
+                print(f"  设置环境变量 CLI_KIT_DAEMON=1 后，命令将自动转发给守护进程。")
+                return
+        print(f"{Fore.RED}❌ 守护进程启动超时，请尝试 'daemon run' 前台运行查看错误。")
+
+    elif action == "run":
+        if status:
+            print(f"{Fore.YELLOW}守护进程已在运行 (PID {status['pid']})。")
+            return
+        if os.path.exists(path):
+            os.remove(path)  # 上次异常退出残留的套接字文件
+        print(f"{Fore.CYAN}🔥 守护进程前台运行中: {path} (Ctrl+C 停止)")
+        WarmServer(get_root_dir(), tools).serve_forever(path)
@@ -1,5 +1,10 @@
+import os
 import sys
+import json
+import time
+import hashlib
 import subprocess
+import importlib.util
 from colorama import Fore, Style
 
 # 定义必须安装的库
@@ -12,26 +17,138 @@ REQUIRED_LIBS = {
     "psutil": "psutil"
 }
 
-def ensure_dependencies():
-    """静默检查并安装缺失依赖"""
-    for module_name, pip_name in REQUIRED_LIBS.items():
+# 启动器自身 (菜单与彩色输出) 需要的库，其余依赖按插件声明检查
+LAUNCHER_LIBS = ["colorama", "questionary"]
+
+# 依赖检查结果缓存：解释器与 site-packages 未变化时跳过检查
+STATE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "deps_state.json")
+
+def get_fingerprint():
+    """解释器路径 + site-packages 目录 mtime + REQUIRED_LIBS 的哈希"""
+    parts = [sys.executable, sys.version, json.dumps(REQUIRED_LIBS, sort_keys=True)]
+    try:
+        # 冻结环境 (PyInstaller) 可能未打包 site 模块，因此按需导入
+        import site
+        site_dirs = site.getsitepackages() + [site.getusersitepackages()]
+    except (ImportError, AttributeError):
+        site_dirs = []  # 部分虚拟环境/冻结环境不提供 site API
+    if getattr(sys, 'frozen', False):
+        site_dirs.append(sys.executable)
+    for path in site_dirs:
+        try: parts.append(f"{path}:{os.stat(path).st_mtime_ns}")
+        except OSError: pass
+    return hashlib.sha1("\n".join(parts).encode()).hexdigest()
+
+def _load_state(fingerprint):
+    try:
+        with open(STATE_FILE, "r", encoding="utf-8") as f:
+            state = json.load(f)
+        if state.get("fingerprint") == fingerprint:
+            return set(state.get("verified", []))
+    except Exception:
+        pass
+    return set()
+
+def _save_state(fingerprint, verified):
+    try:
+        with open(STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump({"fingerprint": fingerprint, "verified": sorted(verified)}, f)
+    except Exception:
+        pass
+
+def ensure_dependencies(libs=None):
+    """
+    静默检查并安装缺失依赖。
+    libs 为需要检查的导入名列表 (默认 REQUIRED_LIBS 全部)；
+    已在当前环境指纹下验证过的库直接跳过，不再导入。
+    """
+    if libs is None:
+        libs = list(REQUIRED_LIBS)
+    fingerprint = get_fingerprint()
+    verified = _load_state(fingerprint)
+    pending = [name for name in libs if name not in verified]
+    if not pending:
+        return
+
+    for module_name in pending:
+        # find_spec 只定位模块，不执行其顶层代码
+        if importlib.util.find_spec(module_name) is not None:
+            verified.add(module_name)
+            continue
+        pip_name = REQUIRED_LIBS.get(module_name, module_name)
+        print(f"📦 正在自动修复依赖: {pip_name}...")
+        try:
+            subprocess.check_call([sys.executable, "-m", "pip", "install", pip_name, "--quiet"])
+            importlib.invalidate_caches()
+            verified.add(module_name)
+        except Exception as e:
+            print(f"❌ 自动修复失败，请手动执行: pip install {pip_name}")
+
+    # 安装新包会改变 site-packages 的 mtime，重新计算指纹后保存
+    _save_state(get_fingerprint(), verified)
+
+def get_plugin_libs(info):
+    """
+    读取插件在 __info__["deps"] 中声明的依赖 (导入名列表)。
+    未声明的旧插件按 REQUIRED_LIBS 全量检查，保持兼容。
+    """
+    libs = (info or {}).get("deps")
+    return list(REQUIRED_LIBS) if libs is None else list(libs)
+
+class LazyToolkit(dict):
+    """
+    按需解析的全局工具包：ping、probe、notification、qrcode 等首次访问时才导入，
+    并记录每项的解析耗时。兼容插件现有的 tools["xxx"]、"xxx" in tools 写法。
+    """
+    def __init__(self, values=None):
+        super().__init__(values or {})
+        self._factories = {}
+        self.timings = {}
+
+    def register(self, key, factory):
+        """注册延迟解析项，factory 为无参可调用对象"""
+        self._factories[key] = factory
+
+    def __missing__(self, key):
+        factory = self._factories.get(key)
+        if factory is None:
+            raise KeyError(key)
+        start = time.perf_counter()
+        value = factory()
+        self.timings[key] = (time.perf_counter() - start) * 1000
+        self[key] = value
+        del self._factories[key]
+        return value
+
+    def __contains__(self, key):
+        return dict.__contains__(self, key) or key in self._factories
+
+    def get(self, key, default=None):
         try:
-            __import__(module_name)
-        except ImportError:
-            print(f"📦 正在自动修复依赖: {pip_name}...")
-            try:
-                subprocess.check_call([sys.executable, "-m", "pip", "install", pip_name, "--quiet"])
-            except Exception as e:
-                print(f"❌ 自动修复失败，请手动执行: pip install {pip_name}")
+            return self[key]
+        except (KeyError, ImportError):
+            return default
+
+    def available(self):
+        """列出全部可用项 (含尚未解析的)"""
+        return list(self.keys()) + list(self._factories)
+
+def _import_attr(module_name, attr=None):
+    def factory():
+        mod = importlib.import_module(module_name)
+        return getattr(mod, attr) if attr else mod
+    return factory
 
 def get_toolkit():
-    """提供给所有插件的全局工具包"""
-    from ping3 import ping
-    from plyer import notification
-    return {
+    """提供给所有插件的全局工具包，除颜色常量外均在首次访问时导入"""
+    toolkit = LazyToolkit({
         "Fore": Fore,
         "Style": Style,
-        "ping": ping,
-        "notification": notification,
         "libs": REQUIRED_LIBS  # 将依赖列表也暴露给工具箱
-    }
\ No newline at end of file
+    })
+    toolkit.register("ping", _import_attr("ping3", "ping"))
+    toolkit.register("notification", _import_attr("plyer", "notification"))
+    toolkit.register("qrcode", _import_attr("qrcode"))
+    # 延迟探测后端 (ICMP/TCP/UDP)，普通用户也可用 TCP/UDP 测量延迟
+    toolkit.register("probe", _import_attr("core.probe"))
+    return toolkit
@@ -0,0 +1,275 @@
+import os
+import ast
+import json
+import importlib
+
+# 清单格式版本，结构变化时递增以使旧缓存失效
+MANIFEST_VERSION = 3
+CACHE_FILE = "manifest_cache.json"
+
+# setup_args 中的 type 参数只缓存内置类型，其余情况回退为真实导入
+ARG_TYPES = {"int": int, "float": float, "str": str}
+
+
+class ArgRecorder:
+    """模拟 argparse 子解析器，记录 setup_args 中的 add_argument 调用"""
+
+    def __init__(self):
+        self.calls = []
+        self.cacheable = True
+
+    def add_argument(self, *args, **kwargs):
+        if "type" in kwargs:
+            type_name = getattr(kwargs["type"], "__name__", None)
+            if type_name not in ARG_TYPES:
+                self.cacheable = False
+            kwargs["type"] = type_name
+        try:
+            json.dumps([args, kwargs])
+        except (TypeError, ValueError):
+            self.cacheable = False
+        self.calls.append([list(args), kwargs])
+
+    def __getattr__(self, name):
+        # 使用了互斥组、set_defaults 等高级能力的插件无法缓存，启动时照常导入
+        self.cacheable = False
+        return lambda *args, **kwargs: self
+
+
+def get_cache_path(root_path):
+    return os.path.join(root_path, "core", CACHE_FILE)
+
+
+def read_cache(root_path):
+    try:
+        with open(get_cache_path(root_path), "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") == MANIFEST_VERSION:
+            return data.get("entries", {})
+    except Exception:
+        pass
+    return {}
+
+
+def write_cache(root_path, entries):
+    """原子写入缓存；只读安装目录下静默跳过"""
+    path = get_cache_path(root_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except Exception:
+        try: os.remove(tmp_path)
+        except: pass
+
+
+def import_entity(kind, name):
+    return importlib.import_module(f"{kind}.{name}")
+
+
+def describe_module(kind, name):
+    """导入模块并提取 __info__、run 函数与 setup_args 参数定义"""
+    mod = import_entity(kind, name)
+    info = getattr(mod, "__info__", None)
+    entry = {
+        "kind": kind,
+        "name": name,
+        "info": info,
+        "runnable": info is not None and hasattr(mod, f"run_{name}"),
+        "args": [],
+    }
+    if hasattr(mod, "setup_args"):
+        recorder = ArgRecorder()
+        try:
+            mod.setup_args(recorder)
+        except Exception:
+            recorder.cacheable = False
+        entry["args"] = recorder.calls if recorder.cacheable else None
+    try:
+        json.dumps(info)
+    except (TypeError, ValueError):
+        entry["info"] = None
+        entry["runnable"] = False
+        entry["error"] = "__info__ 不是可序列化的字面量"
+    return entry
+
+
+def _static_args(func):
+    """
+    静态解析 setup_args 函数体，只接受 parser.add_argument(字面量...) 形式的语句。
+    出现其他逻辑时返回 None，由调用方回退为导入模块执行。
+    """
+    if not func.args.args:
+        return None
+    parser_name = func.args.args[0].arg
+    calls = []
+    for stmt in func.body:
+        if isinstance(stmt, ast.Pass):
+            continue
+        if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant):
+            continue  # 文档字符串
+        if not (isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call)):
+            return None
+        call = stmt.value
+        if not (isinstance(call.func, ast.Attribute) and call.func.attr == "add_argument"
+                and isinstance(call.func.value, ast.Name) and call.func.value.id == parser_name):
+            return None
+        try:
+            args = [ast.literal_eval(a) for a in call.args]
+            kwargs = {}
+            for kw in call.keywords:
+                if kw.arg is None:
+                    return None
+                if kw.arg == "type":
+                    if not (isinstance(kw.value, ast.Name) and kw.value.id in ARG_TYPES):
+                        return None
+                    kwargs["type"] = kw.value.id
+                else:
+                    kwargs[kw.arg] = ast.literal_eval(kw.value)
+        except (ValueError, TypeError, SyntaxError):
+            return None
+        calls.append([args, kwargs])
+    return calls
+
+
+def extract_static(path, kind, name):
+    """
+    使用 ast 解析插件源码，提取 __info__、run 函数与 setup_args，不执行插件代码。
+    __info__ 不是字面量时返回 None。
+    """
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    info = None
+    has_info = False
+    functions = {}
+    imports = []
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(t, ast.Name) and t.id == "__info__" for t in node.targets):
+            has_info = True
+            try:
+                info = ast.literal_eval(node.value)
+            except (ValueError, TypeError, SyntaxError):
+                return None
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions[node.name] = node
+        elif isinstance(node, ast.Import):
+            imports.extend(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            imports.append(node.module.split(".")[0])
+
+    if has_info and not isinstance(info, dict):
+        return None
+
+    # 函数内部的延迟导入 (如 questionary)，供守护进程判断插件是否需要真实终端
+    lazy = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            lazy.update(alias.name.split(".")[0] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            lazy.add(node.module.split(".")[0])
+
+    entry = {
+        "kind": kind,
+        "name": name,
+        "info": info,
+        "runnable": info is not None and f"run_{name}" in functions,
+        "args": [],
+        "imports": sorted(set(imports)),
+        "lazy_imports": sorted(lazy - set(imports)),
+    }
+    if "setup_args" in functions:
+        entry["args"] = _static_args(functions["setup_args"])
+    return entry
+
+
+def load_entries(root_path, kind, names, profiler=None):
+    """
+    读取插件清单。
+    文件 mtime/size 与缓存一致时直接复用缓存；否则用 ast 静态提取元数据，
+    仅当 __info__ 不是字面量时才导入模块，结果回写缓存。
+    传入 profiler 时记录每个组件的清单读取耗时。
+    """
+    cache = read_cache(root_path)
+    entries = []
+    dirty = False
+
+    for name in names:
+        if profiler is None:
+            entry, refreshed = _load_entry(root_path, kind, name, cache)
+        else:
+            with profiler.measure("discovery", f"{kind}.{name}"):
+                entry, refreshed = _load_entry(root_path, kind, name, cache)
+        entries.append(entry)
+        dirty = dirty or refreshed
+
+    if dirty:
+        write_cache(root_path, cache)
+    return entries
+
+
+def _load_entry(root_path, kind, name, cache):
+    """读取单个组件的清单条目，返回 (条目, 是否更新了缓存)"""
+    key = f"{kind}.{name}"
+    path = os.path.join(root_path, kind, f"{name}.py")
+    try:
+        st = os.stat(path)
+    except OSError as e:
+        return {"kind": kind, "name": name, "runnable": False, "error": str(e)}, False
+
+    cached = cache.get(key)
+    if cached and cached.get("mtime") == st.st_mtime_ns and cached.get("size") == st.st_size:
+        return cached, False
+
+    try:
+        entry = extract_static(path, kind, name) or describe_module(kind, name)
+    except Exception as e:
+        # 加载失败不写入缓存，下次启动重试
+        return {"kind": kind, "name": name, "runnable": False, "error": str(e)}, False
+
+    entry["mtime"] = st.st_mtime_ns
+    entry["size"] = st.st_size
+    cache[key] = entry
+    return entry, True
+
+
+def register_entities(subparsers, root_path, kind, names, registry, profiler=None):
+    """
+    按清单为可运行组件注册子命令，条目写入 registry。
+    性能分析模式下强制导入每个组件，以便定位拖慢启动的插件。
+    """
+    profiling = profiler is not None and profiler.enabled
+    for entry in load_entries(root_path, kind, names, profiler):
+        name = entry["name"]
+        try:
+            if entry.get("error"): raise RuntimeError(entry["error"])
+            if profiling and name != 'deps':
+                with profiler.measure("import", f"{kind}.{name}"):
+                    mod = import_entity(kind, name)
+            if not entry["runnable"]: continue
+            info = entry["info"]
+            sub_p = subparsers.add_parser(name, help=info["help"], aliases=info.get("alias", []))
+            if profiling:
+                with profiler.measure("setup_args", f"{kind}.{name}"):
+                    if hasattr(mod, "setup_args"): mod.setup_args(sub_p)
+            elif not apply_args(sub_p, entry):
+                mod = import_entity(kind, name)
+                if hasattr(mod, "setup_args"): mod.setup_args(sub_p)
+            registry[name] = entry
+        except Exception as e:
+            if kind == 'mods': print(f"⚠️  Mod [{name}] 注册失败: {e}")
+            elif name != 'deps': print(f"⚠️  Core [{name}] 注册失败: {e}")
+
+
+def apply_args(parser, entry):
+    """按缓存的 add_argument 调用重建子解析器参数，无法缓存时返回 False"""
+    calls = entry.get("args")
+    if calls is None:
+        return False
+    for args, kwargs in calls:
+        kwargs = dict(kwargs)
+        if "type" in kwargs:
+            kwargs["type"] = ARG_TYPES[kwargs["type"]]
+        parser.add_argument(*args, **kwargs)
+    return True
@@ -0,0 +1,160 @@
+import time
+import socket
+import struct
+import random
+import threading
+
+# 延迟探测后端：统一为 probe(target, timeout=秒) -> 往返耗时 (秒)，无响应返回 None，
+# 与 ping3.ping 的调用方式一致，插件可通过 tools["probe"].get_backend(...) 直接替换 Ping。
+#   icmp  ICMP Echo (ping3)，需要管理员权限或 Linux 的 ping_group_range 放行
+#   tcp   TCP 握手耗时，收到 RST (端口关闭) 同样说明主机可达；普通用户即可使用
+#   udp   向 53 端口发送 DNS 查询的往返耗时，收到 ICMP 端口不可达同样计入
+#   auto  ICMP 可用时使用 ICMP，否则回退为 TCP
+
+DEFAULT_PORTS = {"tcp": 443, "udp": 53}
+BACKEND_NAMES = ["auto", "icmp", "tcp", "udp"]
+# 目标地址解析结果的缓存时间 (秒)，避免高频采样时每次都计入 DNS 耗时
+RESOLVE_TTL = 60.0
+
+
+def split_target(target, default_port):
+    """拆分 host[:port]，IPv6 地址需写成 [::1]:port"""
+    if target.startswith("["):
+        host, _, rest = target[1:].partition("]")
+        return host, int(rest[1:]) if rest.startswith(":") else default_port
+    if target.count(":") == 1:
+        host, _, port = target.partition(":")
+        return host, int(port)
+    return target, default_port
+
+
+class Resolver:
+    """带过期时间的地址解析缓存，线程安全"""
+
+    def __init__(self, ttl=RESOLVE_TTL):
+        self.ttl = ttl
+        self.cache = {}
+        self.lock = threading.Lock()
+
+    def resolve(self, host, port, sock_type):
+        key = (host, port, sock_type)
+        now = time.monotonic()
+        with self.lock:
+            hit = self.cache.get(key)
+            if hit and hit[0] > now:
+                return hit[1]
+        family, _, _, _, addr = socket.getaddrinfo(host, port, type=sock_type)[0]
+        with self.lock:
+            self.cache[key] = (now + self.ttl, (family, addr))
+        return family, addr
+
+
+class TcpProbe:
+    """测量 TCP 三次握手耗时"""
+    name = "tcp"
+
+    def __init__(self, port=None, resolver=None):
+        self.port = port or DEFAULT_PORTS["tcp"]
+        self.resolver = resolver or Resolver()
+
+    def __call__(self, target, timeout=2):
+        try:
+            host, port = split_target(target, self.port)
+            family, addr = self.resolver.resolve(host, port, socket.SOCK_STREAM)
+        except (OSError, ValueError):
+            return None
+        with socket.socket(family, socket.SOCK_STREAM) as s:
+            s.settimeout(timeout)
+            start = time.perf_counter()
+            try:
+                s.connect(addr)
+            except ConnectionRefusedError:
+                pass  # 端口关闭时对方回 RST，耗时同样是一次完整往返
+            except OSError:
+                return None
+            return time.perf_counter() - start
+
+
+class UdpProbe:
+    """向目标发送最小 DNS 查询 (根域 NS 记录)，测量响应耗时"""
+    name = "udp"
+
+    def __init__(self, port=None, resolver=None):
+        self.port = port or DEFAULT_PORTS["udp"]
+        self.resolver = resolver or Resolver()
+
+    @staticmethod
+    def build_query(query_id):
+        # 头部: ID, 标志 (RD), 问题数 1；问题: 根域 "." / NS / IN
+        return struct.pack("!HHHHHH", query_id, 0x0100, 1, 0, 0, 0) + b"\x00" + struct.pack("!HH", 2, 1)
+
+    def __call__(self, target, timeout=2):
+        try:
+            host, port = split_target(target, self.port)
+            family, addr = self.resolver.resolve(host, port, socket.SOCK_DGRAM)
+        except (OSError, ValueError):
+            return None
+        query_id = random.getrandbits(16)
+        with socket.socket(family, socket.SOCK_DGRAM) as s:
+            start = time.perf_counter()
+            deadline = start + timeout
+            try:
+                # connect 后内核才会把 ICMP 端口不可达作为 ConnectionRefusedError 报告给该套接字
+                s.connect(addr)
+                s.send(self.build_query(query_id))
+                while True:
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        return None
+                    s.settimeout(remaining)
+                    data = s.recv(512)
+                    if data[:2] == struct.pack("!H", query_id):
+                        break  # 忽略不属于本次查询的迟到响应
+            except ConnectionRefusedError:
+                pass
+            except OSError:
+                return None
+            return time.perf_counter() - start
+
+
+class IcmpProbe:
+    """ICMP Echo，委托给 ping3 (首次调用时才导入)"""
+    name = "icmp"
+
+    def __init__(self, port=None, resolver=None):
+        self.ping = None
+
+    def __call__(self, target, timeout=2):
+        if self.ping is None:
+            from ping3 import ping
+            self.ping = ping
+        try:
+            delay = self.ping(target, timeout=timeout)
+        except Exception:
+            return None
+        # ping3 超时返回 None、出错返回 False
+        return delay or None
+
+
+BACKENDS = {"icmp": IcmpProbe, "tcp": TcpProbe, "udp": UdpProbe}
+
+
+def icmp_available():
+    """当前进程能否发送 ICMP：原始套接字 (管理员) 或 Linux 非特权 ICMP 套接字"""
+    for sock_type in (socket.SOCK_RAW, socket.SOCK_DGRAM):
+        try:
+            socket.socket(socket.AF_INET, sock_type, socket.IPPROTO_ICMP).close()
+            return True
+        except OSError:
+            continue
+    return False
+
+
+def get_backend(name="auto", port=None):
+    """按名称创建探测后端；auto 在无法发送 ICMP 时回退为 TCP"""
+    name = (name or "auto").lower()
+    if name == "auto":
+        name = "icmp" if icmp_available() else "tcp"
+    if name not in BACKENDS:
+        raise ValueError(f"未知的探测方式: {name} (可选 {', '.join(BACKEND_NAMES)})")
+    return BACKENDS[name](port=port)
@@ -0,0 +1,89 @@
+import sys
+import json
+import time
+from contextlib import contextmanager, nullcontext
+
+# 报告中各阶段的展示顺序
+STAGES = ["discovery", "deps", "toolkit", "import", "setup_args"]
+
+
+class StartupProfiler:
+    """记录启动阶段每个组件的耗时与内存分配，供 --profile-startup 使用"""
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.records = []
+        self.started = time.perf_counter()
+        self.tracemalloc = None
+        if enabled:
+            # tracemalloc 会连带导入 pickle 等模块，仅在开启分析时导入，不拖慢普通启动
+            import tracemalloc
+            self.tracemalloc = tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def measure(self, stage, component, note=""):
+        if not self.enabled:
+            return nullcontext()
+        return self._measure(stage, component, note)
+
+    @contextmanager
+    def _measure(self, stage, component, note):
+        tracemalloc = self.tracemalloc
+        mem_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        start = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            current, peak = tracemalloc.get_traced_memory()
+            self.records.append({
+                "stage": stage,
+                "component": component,
+                "ms": round(elapsed, 3),
+                "mem_kb": round((current - mem_before) / 1024, 1),
+                "peak_kb": round((peak - mem_before) / 1024, 1),
+                "note": error or note,
+            })
+
+    def add_timings(self, stage, timings, prefix=""):
+        """并入外部记录的耗时 (如工具包按需解析的 timings)"""
+        if not self.enabled:
+            return
+        for component, ms in timings.items():
+            self.records.append({"stage": stage, "component": f"{prefix}{component}",
+                                 "ms": round(ms, 3), "mem_kb": 0.0, "peak_kb": 0.0, "note": "按需解析"})
+
+    def summary(self):
+        totals = {}
+        for r in self.records:
+            totals[r["stage"]] = round(totals.get(r["stage"], 0) + r["ms"], 3)
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 3),
+            "stages": totals,
+            "records": self.records,
+        }
+
+    def report(self, fmt="table", stream=None):
+        stream = stream or sys.stdout
+        data = self.summary()
+        if fmt == "json":
+            stream.write(json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+            return
+
+        order = {s: i for i, s in enumerate(STAGES)}
+        rows = sorted(self.records, key=lambda r: (order.get(r["stage"], len(STAGES)), -r["ms"]))
+        stream.write(f"{'阶段':<12} | {'组件':<22} | {'耗时(ms)':>10} | {'内存(KB)':>10} | {'峰值(KB)':>10} | 备注\n")
+        stream.write("-" * 86 + "\n")
+        for r in rows:
+            stream.write(f"{r['stage']:<12} | {r['component']:<22} | {r['ms']:>10.2f} | "
+                         f"{r['mem_kb']:>10.1f} | {r['peak_kb']:>10.1f} | {r['note']}\n")
+        stream.write("-" * 86 + "\n")
+        for stage, ms in data["stages"].items():
+            stream.write(f"{stage:<12} 合计 {ms:.2f} ms\n")
+        stream.write(f"启动总耗时 {data['total_ms']:.2f} ms\n")
@@ -4,7 +4,9 @@ import sys
 
 __info__ = {
     "help": "插件商店",
-    "alias": ["market", "install", "upgrade"]
+    "alias": ["market", "install", "upgrade"],
+    "deps": ["requests", "questionary"],
+    "daemon": False  # 交互式选择插件，需要真实终端
 }
 
 # 1. 链路配置
@@ -23,49 +23,87 @@ def discover_entities(folder_name):
     return [f[:-3] for f in os.listdir(target_dir) 
             if f.endswith('.py') and not f.startswith('__')]
 
+PROFILE_FORMATS = ('table', 'json')
+
+def pop_profile_flag(argv):
+    """取出 --profile-startup [table|json] 或 --profile-startup=格式 参数，返回报告格式，未指定时返回 None"""
+    for i, arg in enumerate(argv[1:], 1):
+        if arg == '--profile-startup':
+            del argv[i]
+            if i < len(argv) and argv[i] in PROFILE_FORMATS:
+                return argv.pop(i)
+            return 'table'
+        if arg.startswith('--profile-startup='):
+            del argv[i]
+            fmt = arg.partition('=')[2] or 'table'
+            if fmt not in PROFILE_FORMATS:
+                sys.exit(f"--profile-startup: 无效的报告格式 '{fmt}' (可选 {', '.join(PROFILE_FORMATS)})")
+            return fmt
+    return None
+
+def run_entity(entry, args, tools):
+    """仅检查该组件声明的依赖，并只导入实际被调度的组件执行"""
+    name = entry["name"]
+    deps = tools.get("deps")
+    if hasattr(deps, "get_plugin_libs"): deps.ensure_dependencies(deps.get_plugin_libs(entry["info"]))
+    mod = importlib.import_module(f"{entry['kind']}.{name}")
+    return getattr(mod, f"run_{name}")(args, tools)
+
 def main():
+    from core.profiler import StartupProfiler
+    profile_fmt = pop_profile_flag(sys.argv)
+    profiler = StartupProfiler(enabled=profile_fmt is not None)
+
+    # 0. 守护进程转发 (需设置 CLI_KIT_DAEMON=1)：守护进程在运行时跳过全部本地加载
+    if profile_fmt is None and os.environ.get("CLI_KIT_DAEMON") == "1" and len(sys.argv) > 1:
+        try:
+            from core import daemon
+            code = daemon.forward(sys.argv[1:])
+        except Exception:
+            code = None
+        if code is not None: sys.exit(code)
+
     # 1. 扫描文件夹
-    core_names = discover_entities('core')
-    mod_names = discover_entities('mods')
+    with profiler.measure("discovery", "core/"): core_names = discover_entities('core')
+    with profiler.measure("discovery", "mods/"): mod_names = discover_entities('mods')
     
     system_tools = {}
-    core_entities = {}  # 存放核心可执行组件
-    mod_entities = {}   # 存放功能可执行组件
+    core_entities = {}  # 存放核心可执行组件 (清单条目)
+    mod_entities = {}   # 存放功能可执行组件 (清单条目)
     
     parser = argparse.ArgumentParser(description="CLI-Kit")
+    parser.add_argument("--profile-startup", nargs="?", choices=PROFILE_FORMATS, const="table",
+                        help="输出启动阶段各组件的耗时与内存报告 (默认 table)")
     subparsers = parser.add_subparsers(dest="command")
 
     # 2. 加载 Core 组件 (支撑工具箱)
     if 'deps' in core_names:
         try:
-            deps = importlib.import_module('core.deps')
-            if hasattr(deps, 'ensure_dependencies'): deps.ensure_dependencies()
-            if hasattr(deps, 'get_toolkit'): system_tools.update(deps.get_toolkit())
+            with profiler.measure("import", "core.deps"):
+                deps = importlib.import_module('core.deps')
+            with profiler.measure("deps", "ensure_dependencies"):
+                # 旧版 deps 没有 LAUNCHER_LIBS / 不接受参数时，按原方式全量检查
+                if hasattr(deps, 'ensure_dependencies'):
+                    launcher_libs = getattr(deps, 'LAUNCHER_LIBS', None)
+                    if launcher_libs is None: deps.ensure_dependencies()
+                    else: deps.ensure_dependencies(launcher_libs)
+            with profiler.measure("toolkit", "get_toolkit"):
+                if hasattr(deps, 'get_toolkit'): system_tools = deps.get_toolkit()
+            # core 组件同样按需导入，启动时不加载全部核心模块
+            for name in core_names:
+                if hasattr(system_tools, 'register') and name not in system_tools:
+                    system_tools.register(name, lambda n=name: importlib.import_module(f'core.{n}'))
         except Exception as e: print(f"⚠️  Deps 加载失败: {e}")
 
-    for name in core_names:
-        try:
-            mod = importlib.import_module(f'core.{name}')
-            system_tools[name] = mod
-            if hasattr(mod, "__info__") and hasattr(mod, f"run_{name}"):
-                info = mod.__info__
-                sub_p = subparsers.add_parser(name, help=info["help"], aliases=info.get("alias", []))
-                if hasattr(mod, "setup_args"): mod.setup_args(sub_p)
-                core_entities[name] = mod
-        except Exception as e:
-            if name != 'deps': print(f"⚠️  Core [{name}] 注册失败: {e}")
-
-    # 3. 加载 Mods 插件
-    for name in mod_names:
-        try:
-            mod = importlib.import_module(f"mods.{name}")
-            if hasattr(mod, "__info__") and hasattr(mod, f"run_{name}"):
-                info = mod.__info__
-                sub_p = subparsers.add_parser(name, help=info["help"], aliases=info.get("alias", []))
-                if hasattr(mod, "setup_args"): mod.setup_args(sub_p)
-                mod_entities[name] = mod
-        except Exception as e:
-            print(f"⚠️  Mod [{name}] 注册失败: {e}")
+    # 3. 读取插件清单：文件未变化时直接使用缓存的元数据，不导入插件
+    #    性能分析模式下强制导入每个组件，以便定位拖慢启动的插件
+    from core import manifest
+    manifest.register_entities(subparsers, ROOT_PATH, 'core', core_names, core_entities, profiler)
+    manifest.register_entities(subparsers, ROOT_PATH, 'mods', mod_names, mod_entities, profiler)
+
+    if profiler.enabled and len(sys.argv) == 1:
+        profiler.report(profile_fmt)
+        return
 
     # 4. 交互界面
     if len(sys.argv) == 1:
@@ -84,15 +122,15 @@ def main():
             if mod_entities:
                 # 【修复点】: 分隔符使用纯文本，不包含颜色代码
                 choices.append(questionary.Separator("--- FUNCTIONAL MODS ---"))
-                for name, mod in mod_entities.items():
-                    info = mod.__info__
+                for name, entry in mod_entities.items():
+                    info = entry["info"]
                     choices.append(f"{name:<12} | {info.get('help', '...')}")
             
             # --- 第二部分：CORE (置底) ---
             if core_entities:
                 choices.append(questionary.Separator("--- SYSTEM CORE ---"))
-                for name, mod in core_entities.items():
-                    info = mod.__info__
+                for name, entry in core_entities.items():
+                    info = entry["info"]
                     choices.append(f"{name:<12} | {info.get('help', '...')}")
             
             choices.append(questionary.Separator("-" * 20))
@@ -121,7 +159,7 @@ def main():
             
             try:
                 # 运行插件
-                getattr(all_executables[cmd_name], f"run_{cmd_name}")(args, system_tools)
+                run_entity(all_executables[cmd_name], args, system_tools)
             except Exception as e:
                 print(f"{Fore.RED}运行出错: {e}")
             
@@ -131,11 +169,15 @@ def main():
         args = parser.parse_args()
         if args.command:
             all_executables = {**mod_entities, **core_entities}
-            for name, mod in all_executables.items():
-                info = mod.__info__
+            for name, entry in all_executables.items():
+                info = entry["info"]
                 if args.command == name or args.command in info.get("alias", []):
-                    getattr(mod, f"run_{name}")(args, system_tools)
+                    run_entity(entry, args, system_tools)
                     break
+        if profiler.enabled:
+            # 命令输出走 stdout，报告写入 stderr 避免混在一起
+            profiler.add_timings("toolkit", getattr(system_tools, "timings", {}), prefix="tools.")
+            profiler.report(profile_fmt, sys.stderr)
 
 if __name__ == "__main__":
     try: main()
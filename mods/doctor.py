@@ -1,83 +1,572 @@
-import socket
+import ssl
 import time
-import requests
-from concurrent.futures import ThreadPoolExecutor
+import socket
+import json
+import base64
+import asyncio
+import statistics
+from urllib.parse import urlsplit, urljoin, unquote
+from urllib.request import getproxies, proxy_bypass
 
 __info__ = {
     "help": "网络医生：检查 GitHub、Google、NPM 等开发环境连通性",
-    "alias": ["dr", "netcheck"]  # 将这里的 checkup 改为 netcheck，避免与 env_check 冲突
+    "alias": ["dr", "netcheck"],  # 将这里的 checkup 改为 netcheck，避免与 env_check 冲突
+    "deps": [],
+    "daemon": False  # --watch 会持续运行，始终在本地执行
 }
 
 def setup_args(parser):
     """该模块主要通过交互式或直接运行"""
     parser.add_argument("--timeout", type=int, default=5, help="请求超时时间")
+    parser.add_argument("--rounds", type=int, default=3, help="每个服务检查的轮数，按轮次统计各阶段耗时的中位数与 p95")
+    parser.add_argument("--suite", help="从 JSON/YAML 文件读取待检查的端点列表 (替代内置的开发者服务)")
+    parser.add_argument("--concurrency", type=int, default=50, help="同时检查的端点数上限")
+    parser.add_argument("--watch", type=float, metavar="SECONDS", help="持续监控：按间隔重复检查并保持连接，只输出状态变化")
+    parser.add_argument("--threshold", type=float, default=50, help="watch 模式下 TTFB 超过基线的百分比阈值，超过即报告劣化")
 
-def check_service(name, url, timeout):
-    """检查单个服务的响应速度"""
-    start = time.time()
-    try:
-        # 使用 head 请求减少流量消耗
-        response = requests.head(url, timeout=timeout, allow_redirects=True)
-        elapsed = (time.time() - start) * 1000
-        if response.status_code < 400:
-            return name, True, f"{elapsed:.0f}ms", response.status_code
+# 未指定 --suite 时检查的核心开发者服务
+DEFAULT_SERVICES = [
+    ("GitHub", "https://github.com"),
+    ("Google", "https://www.google.com"),
+    ("PyPI (Python)", "https://pypi.org"),
+    ("NPM (Node)", "https://registry.npmjs.org"),
+    ("Docker Hub", "https://hub.docker.com"),
+    ("GitHub Raw", "https://raw.githubusercontent.com"),
+    ("Baidu (Base)", "https://www.baidu.com")
+]
+# 服务名称列的最大宽度
+NAME_WIDTH = 30
+# watch 模式：延迟基线的 EWMA 平滑系数，以及判定劣化所需的最小绝对增幅 (毫秒，过滤低延迟下的抖动)
+BASELINE_ALPHA = 0.2
+REGRESS_MIN_MS = 50
+
+# 与 requests 的 allow_redirects 一致，跟随跳转直至最终响应 (上限次数)
+MAX_REDIRECTS = 5
+
+# 连接阶段的展示顺序
+PHASES = [("dns", "DNS"), ("tcp", "TCP"), ("tls", "TLS"), ("ttfb", "TTFB")]
+# 各阶段出错时的说明
+PHASE_ERRORS = {"dns": "DNS 解析失败", "tcp": "无法建立连接", "tls": "TLS 握手失败", "ttfb": "服务无响应"}
+# 某阶段中位数超过该值 (毫秒) 时视为瓶颈，并在总结中给出建议
+SLOW_PHASE_MS = 300
+PHASE_ADVICE = {
+    "dns": "DNS 解析缓慢，建议更换 DNS 服务器 (如 223.5.5.5 / 119.29.29.29) 或检查 hosts 配置。",
+    "tcp": "TCP 建连缓慢，网络线路绕行或丢包，可尝试代理/加速器。",
+    "tls": "TLS 握手缓慢，可能存在中间设备干扰或线路质量差。",
+    "ttfb": "服务器处理缓慢 (TTFB 高)，瓶颈在服务端而非本地网络。",
+}
+
+class CheckError(Exception):
+    """检查失败，phase 记录出错的连接阶段"""
+    def __init__(self, phase, reason):
+        super().__init__(reason)
+        self.phase = phase
+
+def mask_proxy(url):
+    """去掉代理地址中的账号密码，用于输出"""
+    netloc = urlsplit(url if "://" in url else f"http://{url}").netloc
+    return url.replace(netloc, netloc.rpartition("@")[2], 1)
+
+class HttpPool:
+    """
+    共享的异步 HTTP 客户端：所有检查共用一个事件循环与 SSL 上下文 (CA 证书只加载一次)，
+    keep-alive 连接按 (主机, 端口, 协议) 放回空闲池供后续请求复用，同一目标可保留多个空闲连接。
+    新建连接时分别记录 DNS 解析、TCP 握手、TLS 握手耗时，每次请求记录首字节时间 (TTFB)。
+    遵循 HTTP(S)_PROXY / NO_PROXY 环境变量：https 经 CONNECT 隧道，http 向代理发送完整 URL；
+    此时 DNS/TCP 阶段测量的是到代理的解析与建连 (TCP 含 CONNECT 隧道建立)。
+    """
+    def __init__(self, limit, timeout):
+        self.sem = asyncio.Semaphore(limit)
+        self.timeout = timeout
+        self.idle = {}
+        self.proxies = getproxies()
+        self.ssl_ctx = ssl.create_default_context()
+        # 内部自签名证书的端点 (verify: false) 使用不校验证书的上下文
+        self.insecure_ctx = ssl.create_default_context()
+        self.insecure_ctx.check_hostname = False
+        self.insecure_ctx.verify_mode = ssl.CERT_NONE
+
+    async def close(self):
+        for conns in self.idle.values():
+            for _, writer in conns:
+                writer.close()
+        self.idle.clear()
+
+    async def _step(self, phase, awaitable, timeout):
+        """执行一个连接阶段，把超时与网络错误统一转换为 CheckError"""
+        try:
+            return await asyncio.wait_for(awaitable, timeout)
+        except asyncio.TimeoutError:
+            raise CheckError(phase, f"{dict(PHASES)[phase]} 超时")
+        except ssl.SSLCertVerificationError:
+            raise CheckError(phase, "证书校验失败")
+        except ConnectionRefusedError:
+            raise CheckError(phase, "连接被拒绝")
+        except (OSError, EOFError, asyncio.IncompleteReadError):
+            raise CheckError(phase, PHASE_ERRORS[phase])
+
+    def proxy_for(self, scheme, host):
+        """返回该请求应使用的代理 (SplitResult)，未配置或命中 NO_PROXY 时返回 None"""
+        proxy = self.proxies.get(scheme)
+        if not proxy or proxy_bypass(host):
+            return None
+        if "://" not in proxy:
+            proxy = f"http://{proxy}"
+        parts = urlsplit(proxy)
+        if parts.scheme != "http" or not parts.hostname:
+            raise CheckError("tcp", f"不支持的代理: {mask_proxy(proxy)} (仅支持 http:// 代理)")
+        return parts
+
+    @staticmethod
+    def proxy_auth(proxy):
+        if not proxy.username:
+            return ""
+        token = base64.b64encode(f"{unquote(proxy.username)}:{unquote(proxy.password or '')}".encode()).decode()
+        return f"Proxy-Authorization: Basic {token}\r\n"
+
+    async def _tunnel(self, sock, host, port, proxy, timeout):
+        """在到代理的连接上建立 CONNECT 隧道"""
+        loop = asyncio.get_running_loop()
+        request = f"CONNECT {host}:{port} HTTP/1.1\r\nHost: {host}:{port}\r\n{self.proxy_auth(proxy)}\r\n"
+        await loop.sock_sendall(sock, request.encode())
+        response = b""
+        while b"\r\n\r\n" not in response:
+            chunk = await loop.sock_recv(sock, 4096)
+            if not chunk or len(response) > 16384:
+                raise EOFError()
+            response += chunk
+        status = response.split(b"\r\n", 1)[0].split()
+        if len(status) < 2 or status[1] != b"200":
+            raise CheckError("tcp", f"代理拒绝 CONNECT ({b' '.join(status[1:]).decode('latin-1') or '无响应'})")
+
+    async def _connect(self, host, port, tls, verify, timings, timeout, proxy=None):
+        loop = asyncio.get_running_loop()
+        mark = time.perf_counter()
+        conn_host, conn_port = (proxy.hostname, proxy.port or 80) if proxy else (host, port)
+        infos = await self._step("dns", loop.getaddrinfo(conn_host, conn_port, type=socket.SOCK_STREAM), timeout)
+        family, _, _, _, addr = infos[0]
+        now = time.perf_counter()
+        timings["dns"], mark = (now - mark) * 1000, now
+
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.setblocking(False)
+        try:
+            await self._step("tcp", loop.sock_connect(sock, addr), timeout)
+            if proxy and tls:
+                await self._step("tcp", self._tunnel(sock, host, port, proxy, timeout), timeout)
+            now = time.perf_counter()
+            timings["tcp"], mark = (now - mark) * 1000, now
+            if not tls:
+                return await asyncio.open_connection(sock=sock)
+            # 在已建立的套接字上握手，单独计量 TLS 耗时
+            ctx = self.ssl_ctx if verify else self.insecure_ctx
+            conn = await self._step("tls", asyncio.open_connection(sock=sock, ssl=ctx, server_hostname=host), timeout)
+            timings["tls"] = (time.perf_counter() - mark) * 1000
+            return conn
+        except BaseException:
+            sock.close()
+            raise
+
+    async def _request(self, url, fresh, timeout, verify):
+        """单次 HEAD 请求，返回 (状态码, 各阶段耗时, Location)"""
+        parts = urlsplit(url)
+        tls = parts.scheme == "https"
+        host = parts.hostname
+        port = parts.port or (443 if tls else 80)
+        path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        proxy = self.proxy_for(parts.scheme, host)
+        extra = ""
+        if proxy and not tls:
+            # 明文 HTTP 经代理：请求行使用完整 URL，连接按代理复用
+            path = f"http://{parts.netloc}{path}"
+            extra = self.proxy_auth(proxy)
+        key = (host, port, tls, verify, proxy.netloc if proxy else None)
+
+        conns = self.idle.setdefault(key, [])
+        conn = conns.pop() if conns else None
+        if conn and fresh:
+            conn[1].close()
+            conn = None
+        reused = conn is not None
+        timings = {}
+        start = time.perf_counter()
+        reader, writer = conn or await self._connect(host, port, tls, verify, timings, timeout, proxy)
+        try:
+            sent = time.perf_counter()
+            writer.write((f"HEAD {path} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: CLI-Kit-Doctor\r\n"
+                          f"Accept: */*\r\nConnection: keep-alive\r\n{extra}\r\n").encode())
+            try:
+                status_line = await self._step("ttfb", reader.readline(), timeout)
+            except CheckError as e:
+                # 空闲连接被对端重置 (RST) 时与读到 EOF 同样处理；超时不重试
+                if not (reused and isinstance(e.__context__, (ConnectionError, ssl.SSLError))):
+                    raise
+                status_line = b""
+            if not status_line and reused:
+                # 空闲连接已被服务端关闭，换新连接重试 (仅一次)
+                writer.close()
+                return await self._request(url, True, timeout, verify)
+            timings["ttfb"] = (time.perf_counter() - sent) * 1000
+
+            headers = {}
+            for _ in range(100):
+                line = await self._step("ttfb", reader.readline(), timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            try:
+                status = int(status_line.split()[1])
+            except (IndexError, ValueError):
+                raise CheckError("ttfb", "响应不是 HTTP")
+            timings["total"] = (time.perf_counter() - start) * 1000
+
+            # HEAD 响应没有响应体，未要求关闭时连接可直接复用
+            if headers.get("connection", "").lower() != "close":
+                self.idle.setdefault(key, []).append((reader, writer))
+            else:
+                writer.close()
+            return status, timings, headers.get("location")
+        except BaseException:
+            writer.close()
+            raise
+
+    async def request(self, url, fresh=False, timeout=None, verify=True):
+        """
+        发送 HEAD 请求并跟随跳转，返回 (最终状态码, 各阶段耗时 ms，多跳时逐项累加)；
+        fresh 时不复用空闲连接，以测量完整的建连过程。
+        """
+        async with self.sem:
+            totals = {}
+            for _ in range(MAX_REDIRECTS + 1):
+                status, timings, location = await self._request(url, fresh, timeout or self.timeout, verify)
+                for phase, ms in timings.items():
+                    totals[phase] = totals.get(phase, 0.0) + ms
+                if not (300 <= status < 400 and location):
+                    return status, totals
+                url = urljoin(url, location)
+                if urlsplit(url).scheme not in ("http", "https"):
+                    return status, totals
+            raise CheckError("ttfb", f"重定向超过 {MAX_REDIRECTS} 次")
+
+def parse_expect(value):
+    """
+    期望状态码：整数、"2xx" 形式的区间，或二者组成的列表。
+    返回 [(下限, 上限), ...]，未指定时返回 None (任何 HTTP 响应都算在线)。
+    """
+    if value is None:
+        return None
+    ranges = []
+    for item in value if isinstance(value, list) else [value]:
+        text = str(item).strip().lower()
+        if len(text) == 3 and text[0].isdigit() and text[1:] == "xx":
+            base = int(text[0]) * 100
+            ranges.append((base, base + 99))
+        elif text.isdigit():
+            ranges.append((int(text), int(text)))
+        else:
+            raise ValueError(f"无法识别的期望状态码: {item}")
+    return ranges
+
+def status_ok(expect, status):
+    return expect is None or any(lo <= status <= hi for lo, hi in expect)
+
+# 端点清单格式 (JSON 或 YAML)，顶层可直接是端点列表：
+#   defaults:  {timeout: 5, expect: [200, "3xx"], verify: true}   # 可选，作用于全部端点
+#   endpoints:
+#     - url: https://mirrors.example.com/pypi/simple/
+#       name: PyPI 镜像                                           # 可选，默认取主机名
+#       timeout: 3                                                # 可选，单位秒
+#       expect: 200                                               # 可选，不符时计为异常
+#       verify: false                                             # 可选，跳过证书校验 (内部自签名证书)
+ENDPOINT_KEYS = {"url", "name", "timeout", "expect", "verify"}
+
+def load_suite(path):
+    """读取端点清单，.yaml/.yml 需要 PyYAML，其余按 JSON 解析"""
+    with open(path, "r", encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("读取 YAML 清单需要 PyYAML (pip install pyyaml)，或改用 JSON 格式")
+            data = yaml.safe_load(f)
         else:
-            return name, True, f"{elapsed:.0f}ms (状态码: {response.status_code})", response.status_code
-    except requests.exceptions.Timeout:
-        return name, False, "超时", None
-    except Exception:
-        return name, False, "不可达", None
+            data = json.load(f)
+    return parse_suite(data)
+
+def parse_suite(data):
+    if isinstance(data, list):
+        data = {"endpoints": data}
+    if not isinstance(data, dict) or not isinstance(data.get("endpoints"), list):
+        raise ValueError("清单需包含 endpoints 列表")
+    defaults = data.get("defaults") or {}
+    endpoints = []
+    for i, item in enumerate(data["endpoints"], 1):
+        if isinstance(item, str):
+            item = {"url": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"第 {i} 个端点格式错误")
+        item = {**defaults, **item}
+        unknown = set(item) - ENDPOINT_KEYS
+        if unknown:
+            raise ValueError(f"第 {i} 个端点包含未知字段: {', '.join(sorted(unknown))}")
+        url = str(item.get("url") or "")
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"第 {i} 个端点的 url 无效: {url or '(空)'}")
+        try:
+            endpoints.append({
+                "name": str(item.get("name") or parts.hostname),
+                "url": url,
+                "timeout": float(item["timeout"]) if item.get("timeout") else None,
+                "expect": parse_expect(item.get("expect")),
+                "verify": bool(item.get("verify", True)),
+            })
+        except ValueError as e:
+            raise ValueError(f"第 {i} 个端点: {e}")
+    return endpoints
+
+def percentile(ordered, q):
+    """ordered 需已排序"""
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def phase_stats(samples):
+    """各阶段耗时的 (中位数, p95)，未经历的阶段 (如明文 HTTP 的 TLS) 不出现在结果中"""
+    stats = {}
+    for phase in [p for p, _ in PHASES] + ["total"]:
+        values = sorted(s[phase] for s in samples if phase in s)
+        if values:
+            stats[phase] = (statistics.median(values), percentile(values, 0.95))
+    return stats
+
+async def check_service(pool, endpoint, rounds, fresh=True):
+    """逐轮检查单个端点，默认每轮新建连接以分别测量 DNS/TCP/TLS/TTFB"""
+    samples, status, error = [], None, None
+    for _ in range(rounds):
+        try:
+            status, timings = await pool.request(endpoint["url"], fresh, endpoint["timeout"], endpoint["verify"])
+            samples.append(timings)
+        except CheckError as e:
+            error = e
+    return {**endpoint, "status": status, "samples": samples, "error": error, "rounds": rounds}
+
+def bottleneck(stats):
+    """中位数最大的阶段"""
+    phases = [(stats[p][0], p) for p, _ in PHASES if p in stats]
+    return max(phases)[1] if phases else None
+
+def format_phase(stats, phase):
+    if phase not in stats:
+        return "-"
+    median, p95 = stats[phase]
+    return f"{median:.0f}/{p95:.0f}"
+
+def format_row(res, Fore, width):
+    """格式化单个端点的结果行，返回 (行文本, 是否正常, 偏慢的阶段或 None)"""
+    name = res["name"][:width]
+    if not res["samples"]:
+        return f"{name:<{width}} | {Fore.RED}○ 离线{Fore.RESET}   | {Fore.YELLOW}{res['error']}", False, None
+
+    stats = phase_stats(res["samples"])
+    cells = " | ".join(f"{format_phase(stats, p):>9}" for p, _ in PHASES + [("total", "")])
+    slow = bottleneck(stats)
+    note = dict(PHASES)[slow] if slow else "-"
+    if slow and stats[slow][0] > SLOW_PHASE_MS:
+        note = f"{Fore.YELLOW}{note} 偏慢"
+    else:
+        slow = None
+
+    ok = status_ok(res["expect"], res["status"])
+    extra = []
+    if not ok:
+        extra.append(f"状态码 {res['status']} 不符合预期")
+    elif res["status"] >= 400:
+        extra.append(f"状态码: {res['status']}")
+    failed = res["rounds"] - len(res["samples"])
+    if failed:
+        extra.append(f"失败 {failed}/{res['rounds']}: {res['error']}")
+    suffix = f" {Fore.YELLOW}({', '.join(extra)})" if extra else ""
+    status = f"{Fore.GREEN}● 在线{Fore.RESET}" if ok else f"{Fore.RED}✕ 异常{Fore.RESET}"
+    return f"{name:<{width}} | {status}   | {cells} | {note}{suffix}", ok, slow
+
+class WatchState:
+    """
+    watch 模式下单个端点的状态：是否在线、延迟基线 (EWMA) 与是否处于劣化中。
+    基线只跟踪 TTFB：空闲连接被关闭后重连的那一轮总耗时会包含 DNS/TCP/TLS，
+    用总耗时比较会把正常的重连误报为延迟劣化。
+    """
+    def __init__(self):
+        self.up = None
+        self.down_since = None
+        self.baseline = None
+        self.regressed = False
+        self.regressions = 0
+        self.checks = 0
+        self.failures = 0
+
+    def update(self, res, threshold):
+        """并入一次检查结果，返回状态变化 [(颜色名, 说明), ...]；首次检查返回初始状态"""
+        self.checks += 1
+        now = time.time()
+        ok = bool(res["samples"]) and status_ok(res["expect"], res["status"])
+        first = self.up is None
+        events = []
+        if not ok:
+            self.failures += 1
+            reason = res["error"] if not res["samples"] else f"状态码 {res['status']} 不符合预期"
+            if first or self.up:
+                self.down_since = now
+                events.append(("RED", f"○ 离线: {reason}" if first else f"↓ 在线 → 离线: {reason}"))
+            self.up = False
+            return events
+
+        latency = res["samples"][-1]["total"]
+        ttfb = res["samples"][-1]["ttfb"]
+        if first:
+            events.append(("GREEN", f"● 在线 {latency:.0f} ms"))
+        elif not self.up:
+            events.append(("GREEN", f"↑ 离线 → 在线 {latency:.0f} ms (中断约 {now - self.down_since:.0f} 秒)"))
+        self.up = True
+
+        if self.baseline is not None:
+            limit = max(self.baseline * (1 + threshold / 100), self.baseline + REGRESS_MIN_MS)
+            if ttfb > limit and not self.regressed:
+                self.regressed = True
+                self.regressions += 1
+                events.append(("YELLOW", f"⚠ 延迟劣化 TTFB {ttfb:.0f} ms (基线 {self.baseline:.0f} ms, "
+                                         f"+{(ttfb / self.baseline - 1) * 100:.0f}%)"))
+            elif ttfb <= limit and self.regressed:
+                self.regressed = False
+                events.append(("GREEN", f"✓ 延迟恢复 TTFB {ttfb:.0f} ms (基线 {self.baseline:.0f} ms)"))
+        # 劣化期间的样本不计入基线，避免基线被拉高后"自动恢复"
+        if not self.regressed:
+            self.baseline = ttfb if self.baseline is None else \
+                (1 - BASELINE_ALPHA) * self.baseline + BASELINE_ALPHA * ttfb
+        return events
+
+def watch(endpoints, interval, threshold, concurrency, timeout, Fore, width):
+    """
+    按固定时钟重复检查全部端点，只输出状态变化。
+    整个监控期间复用同一个连接池，keep-alive 连接在轮次之间保持，不会重复解析 DNS 与握手 TLS。
+    """
+    states = {i: WatchState() for i in range(len(endpoints))}
+    cycles = []
+
+    async def loop():
+        pool = HttpPool(concurrency, timeout)
+        start = time.monotonic()
+        try:
+            while True:
+                async def check(i):
+                    return i, await check_service(pool, endpoints[i], 1, fresh=False)
+                for done in asyncio.as_completed([check(i) for i in states]):
+                    i, res = await done
+                    stamp = time.strftime('%H:%M:%S')
+                    for color, message in states[i].update(res, threshold):
+                        print(f"[{stamp}] {res['name'][:width]:<{width}} | {getattr(Fore, color)}{message}", flush=True)
+                cycles.append(time.monotonic())
+                # 检查耗时超过间隔时跳过错过的时刻，而不是连续补发
+                elapsed = time.monotonic() - start
+                await asyncio.sleep(interval - elapsed % interval)
+        finally:
+            await pool.close()
+
+    try:
+        asyncio.run(loop())
+    except KeyboardInterrupt:
+        pass
+
+    print("-" * 86)
+    print(f"{Fore.YELLOW}[系统] 监控已停止，共完成 {len(cycles)} 轮检查。")
+    unstable = [(endpoints[i], st) for i, st in states.items() if st.failures or st.regressions]
+    if not unstable:
+        print(f"{Fore.GREEN}✅ 监控期间全部端点持续在线，未出现延迟劣化。")
+    for endpoint, st in unstable:
+        availability = (st.checks - st.failures) / st.checks * 100 if st.checks else 0
+        note = f" | 延迟劣化 {st.regressions} 次" if st.regressions else ""
+        note += " (仍处于劣化中)" if st.regressed else ""
+        print(f"    {Fore.YELLOW}{endpoint['name'][:width]:<{width}}{Fore.RESET} 可用率 {availability:5.1f}% "
+              f"({st.failures}/{st.checks} 次失败){note}")
 
 def run_doctor(args, tools):
     Fore = tools["Fore"]
-    timeout = getattr(args, 'timeout', 5)
+    timeout = getattr(args, 'timeout', 5) or 5
+    rounds = max(1, getattr(args, 'rounds', 3) or 3)
+    concurrency = max(1, getattr(args, 'concurrency', 50) or 50)
+    suite = getattr(args, 'suite', None)
 
     print(f"{Fore.CYAN}🩺 CLI-Kit 网络医生 - 正在诊断开发环境连通性...")
-    print("-" * 62)
-
-    # 待检查的核心开发者服务
-    services = [
-        ("GitHub", "https://github.com"),
-        ("Google", "https://www.google.com"),
-        ("PyPI (Python)", "https://pypi.org"),
-        ("NPM (Node)", "https://registry.npmjs.org"),
-        ("Docker Hub", "https://hub.docker.com"),
-        ("GitHub Raw", "https://raw.githubusercontent.com"),
-        ("Baidu (Base)", "https://www.baidu.com")
-    ]
-
-    # 使用线程池并发检查，提高效率
-    print(f"{'服务名称':<15} | {'状态':<10} | {'响应延迟 / 错误原因':<25}")
-    print("-" * 62)
-
-    with ThreadPoolExecutor(max_workers=len(services)) as executor:
-        futures = [executor.submit(check_service, name, url, timeout) for name, url in services]
-        
-        success_count = 0
-        for future in futures:
-            name, is_up, msg, code = future.result()
-            
-            if is_up:
-                status_icon = f"{Fore.GREEN}● 在线"
-                success_count += 1
-                color_msg = f"{Fore.WHITE}{msg}"
-            else:
-                status_icon = f"{Fore.RED}○ 离线"
-                color_msg = f"{Fore.YELLOW}{msg}"
-            
-            print(f"{name:<15} | {status_icon:<10} | {color_msg}")
+    print("-" * 86)
 
-    print("-" * 62)
+    if suite:
+        try:
+            endpoints = load_suite(suite)
+        except (OSError, ValueError) as e:
+            print(f"{Fore.RED}❌ 无法读取端点清单: {e}")
+            return
+        print(f"📋 端点清单: {suite} ({len(endpoints)} 个端点，并发上限 {concurrency})")
+    else:
+        endpoints = [{"name": name, "url": url, "timeout": None, "expect": None, "verify": True}
+                     for name, url in DEFAULT_SERVICES]
+    if not endpoints:
+        print(f"{Fore.YELLOW}端点清单为空，无需检查。")
+        return
+    width = min(NAME_WIDTH, max(15, *(len(e["name"]) for e in endpoints)))
+    proxies = {k: mask_proxy(v) for k, v in getproxies().items() if k in ("http", "https")}
+    if proxies:
+        print(f"🌐 使用代理: {', '.join(f'{k}={v}' for k, v in proxies.items())} (DNS/TCP 为到代理的耗时)")
+
+    interval = getattr(args, 'watch', None)
+    if interval:
+        threshold = max(0.0, getattr(args, 'threshold', 50) or 0)
+        print(f"👀 持续监控: 每 {interval:g}s 检查 {len(endpoints)} 个端点，只输出状态变化 "
+              f"(TTFB 劣化阈值 +{threshold:g}%) | 按 Ctrl+C 停止")
+        print("-" * 86)
+        watch(endpoints, max(0.1, interval), threshold, concurrency, timeout, Fore, width)
+        return
+
+    print(f"各阶段耗时为 {rounds} 轮的 中位数/p95 (ms)，结果按完成顺序输出")
+    print(f"{'服务名称':<{width}} | {'状态':<8} | {'DNS':>9} | {'TCP':>9} | {'TLS':>9} | {'TTFB':>9} | {'总计':>9} | 瓶颈")
+    print("-" * 86)
+
+    failures = []
+    slow_phases = set()
+
+    async def run_checks():
+        # 所有端点共用一个连接池，同时进行的请求数受 concurrency 限制；每个端点内部按轮次依次进行
+        pool = HttpPool(concurrency, timeout)
+        try:
+            tasks = [check_service(pool, endpoint, rounds) for endpoint in endpoints]
+            for done in asyncio.as_completed(tasks):
+                res = await done
+                line, ok, slow = format_row(res, Fore, width)
+                print(line, flush=True)
+                if not ok:
+                    failures.append(res)
+                if slow:
+                    slow_phases.add(slow)
+        finally:
+            await pool.close()
+
+    asyncio.run(run_checks())
+    print("-" * 86)
 
     # 结果总结与建议
-    if success_count == len(services):
-        print(f"{Fore.GREEN}✅ 所有核心开发服务均可访问，您的网络环境非常完美！")
+    success_count = len(endpoints) - len(failures)
+    if success_count == len(endpoints):
+        print(f"{Fore.GREEN}✅ 全部 {len(endpoints)} 个端点均可访问，您的网络环境非常完美！")
     elif success_count > 0:
-        print(f"{Fore.YELLOW}⚠️  部分服务访问受限。")
-        # 针对中国开发者常见的 GitHub/Google 失败提供建议
-        if "不可达" in str(futures):
+        print(f"{Fore.YELLOW}⚠️  {len(failures)}/{len(endpoints)} 个端点访问受限:")
+        for res in sorted(failures, key=lambda r: r["name"]):
+            reason = res["error"] if not res["samples"] else f"状态码 {res['status']}"
+            print(f"    {Fore.YELLOW}{res['name']:<{width}}{Fore.RESET} {res['url']} - {reason}")
+        if not suite:
+            # 针对中国开发者常见的 GitHub/Google 失败提供建议
             print(f"{Fore.CYAN}💡 建议: 检测到部分国际服务连接失败，请检查您的代理设置或加速器。")
     else:
         print(f"{Fore.RED}❌ 网络连接似乎存在严重问题，请检查路由器或网线。")
-    
-    print("-" * 62)
\ No newline at end of file
+    for phase, _ in PHASES:
+        if phase in slow_phases:
+            print(f"{Fore.CYAN}💡 {PHASE_ADVICE[phase]}")
+
+    print("-" * 86)
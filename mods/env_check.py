@@ -5,7 +5,8 @@ import shutil
 
 __info__ = {
     "help": "开发环境体检：一键检查 Node, Python, Docker 等版本",
-    "alias": ["env", "checkup"]
+    "alias": ["env", "checkup"],
+    "deps": []
 }
 
 def setup_args(parser):
@@ -1,114 +1,948 @@
 import socket
 import time
+import csv
+import re
+import ssl
+import html
+import json
+import asyncio
+import random
+import ipaddress
+import os
 import webbrowser
-from concurrent.futures import ThreadPoolExecutor
-from urllib.request import Request, urlopen
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import sys
+from array import array
 
 __info__ = {
     "help": "深度网络诊断 + 网址一键访问",
-    "alias": ["scan", "check"]
+    "alias": ["scan"],  # 去掉与核心组件 check 冲突的别名
+    "deps": ["questionary", "ping3"],
+    "daemon": False  # 未指定目标时需要交互输入，始终在本地执行
 }
 
 def setup_args(parser):
-    parser.add_argument("target", nargs="?", help="诊断目标 IP 或域名")
-    parser.add_argument("--ports", help="端口范围 (如 80,443,3000)")
+    parser.add_argument("target", nargs="?", help="诊断目标：IP/域名、CIDR (10.0.0.0/24)、范围 (10.0.0.1-20)，可用逗号分隔多个")
+    parser.add_argument("--hosts-file", help="从文件读取目标列表 (每行一个，支持 # 注释)")
+    parser.add_argument("--max-hosts", type=int, default=65536, help="单次扫描的目标主机数上限，防止误输入超大网段 (如 IPv6 /64)")
+    parser.add_argument("--ping", choices=["auto", "icmp", "tcp", "udp"], default="auto",
+                        help="存活探测方式：icmp 需管理员权限，tcp/udp 普通用户可用 (默认 auto，无 ICMP 权限时使用 tcp)")
+    parser.add_argument("--ports", help="端口范围 (如 80,443,8000-8100)，支持端口组 top100/web/db/all 与 ! 排除 (如 top100,!22)")
+    parser.add_argument("--randomize", action="store_true", help="每台主机以不同的伪随机顺序扫描端口")
+    parser.add_argument("--concurrency", type=int, default=500, help="同时进行的连接数上限")
+    parser.add_argument("--timeout", type=float, default=0.8, help="初始连接超时 (秒)，之后按实测 RTT 自适应调整")
+    parser.add_argument("--per-host", type=int, help="单个主机同时进行的连接数上限 (默认：单主机不限，多主机时 100)")
+    parser.add_argument("--rate", type=float, default=0, help="单个主机每秒最多发起的连接数 (0 表示不限)")
+    parser.add_argument("--output", choices=["jsonl", "csv"], help="以机器可读格式逐条输出开放端口 (无交互，日志写入 stderr)")
+    parser.add_argument("--probe-concurrency", type=int, default=50, help="HTTP/横幅探测阶段的并发上限 (与连接扫描分开计)")
+    parser.add_argument("--probe-timeout", type=float, default=1.5, help="单次 HTTP/横幅探测超时 (秒)")
+    parser.add_argument("--checkpoint", help="断点文件：定期记录已完成的端口，中断后以相同参数重新运行即可续扫")
+    parser.add_argument("--cache-ttl", type=float, default=0, help="结果缓存有效期 (秒)，期内重复扫描只探测状态已过期的端口 (0 表示不使用缓存)")
 
-def check_http(target, port):
-    """检查 Web 服务并返回状态码和完整 URL"""
-    protocol = "https" if port == 443 else "http"
-    url = f"{protocol}://{target}:{port}"
+# 探测响应体最多读取的字节数 (用于提取 <title>)
+BODY_LIMIT = 64 * 1024
+# 目标主机数的默认上限 (相当于一个 /16)
+MAX_HOSTS = 65536
+# 多主机扫描且未指定 --per-host 时的单主机并发上限
+DEFAULT_PER_HOST = 100
+# 超时回调比预定时间晚到超过该值 (秒) 时，视为事件循环繁忙
+LOOP_LAG_TOLERANCE = 0.05
+TITLE_RE = re.compile(rb"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+# X.509 subject 中需要展示的属性：CN 与 O
+SUBJECT_OIDS = {b"\x55\x04\x03": "CN", b"\x55\x04\x0a": "O"}
+
+def _der_header(data, pos):
+    """解析 DER 元素头，返回 (tag, 内容起点, 内容终点)"""
+    tag, length = data[pos], data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[pos:pos + n], "big")
+        pos += n
+    return tag, pos, pos + length
+
+def cert_subject(der):
+    """从 DER 证书中提取 subject (CN/O)；探测时不校验证书，仅用于展示"""
     try:
-        req = Request(url, headers={'User-Agent': 'DevBox-Scanner'})
-        with urlopen(req, timeout=1.5) as response:
-            return response.getcode(), url
-    except:
-        return None, url
-
-def check_port(target, port):
-    """检查 TCP 端口是否开放"""
+        _, tbs, _ = _der_header(der, 0)
+        _, pos, tbs_end = _der_header(der, tbs)
+        fields = []
+        while pos < tbs_end:
+            field = _der_header(der, pos)
+            fields.append(field)
+            pos = field[2]
+        if fields[0][0] == 0xA0:  # 可选的 version 字段
+            fields = fields[1:]
+        # serialNumber, signature, issuer, validity, subject
+        _, pos, end = fields[4]
+        parts = []
+        while pos < end:
+            _, rdn, rdn_end = _der_header(der, pos)
+            _, attr, _ = _der_header(der, rdn)
+            _, oid_start, oid_end = _der_header(der, attr)
+            _, val_start, val_end = _der_header(der, oid_end)
+            name = SUBJECT_OIDS.get(der[oid_start:oid_end])
+            if name:
+                parts.append(f"{name}={der[val_start:val_end].decode('utf-8', 'replace')}")
+            pos = rdn_end
+        return ", ".join(parts) or None
+    except (IndexError, ValueError):
+        return None
+
+class ProbePool:
+    """
+    HTTP/横幅探测阶段：并发上限与连接扫描分开计算；
+    同一 (地址, 端口, 协议) 的 keep-alive 连接会被复用 (如跟随跳转后再次探测同一端口)。
+    """
+    def __init__(self, limit, timeout):
+        self.sem = asyncio.Semaphore(limit)
+        self.timeout = timeout
+        self.idle = {}
+        self.ssl_ctx = ssl.create_default_context()
+        self.ssl_ctx.check_hostname = False
+        self.ssl_ctx.verify_mode = ssl.CERT_NONE
+
+    async def close(self):
+        for _, writer in self.idle.values():
+            writer.close()
+        self.idle.clear()
+
+    async def _open(self, host, addr, port, tls):
+        if tls:
+            return await asyncio.wait_for(asyncio.open_connection(
+                addr, port, ssl=self.ssl_ctx, server_hostname=host), self.timeout)
+        return await asyncio.wait_for(asyncio.open_connection(addr, port), self.timeout)
+
+    async def _read_body(self, reader, headers):
+        """读取响应体 (最多 BODY_LIMIT)，返回 (body, 连接是否可复用)"""
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body = b""
+            while len(body) < BODY_LIMIT:
+                size = int((await reader.readline()).split(b";")[0].strip() or b"0", 16)
+                if size == 0:
+                    await reader.readline()
+                    return body, True
+                body += await reader.readexactly(size)
+                await reader.readline()
+            return body, False
+        if "content-length" in headers:
+            length = int(headers["content-length"])
+            body = await reader.readexactly(min(length, BODY_LIMIT))
+            return body, length <= BODY_LIMIT
+        return await reader.read(BODY_LIMIT), False
+
+    async def _request(self, host, addr, port, tls, path):
+        key = (addr, port, tls)
+        conn = self.idle.pop(key, None)
+        reused = conn is not None
+        reader, writer = conn or await self._open(host, addr, port, tls)
+        try:
+            request = (f"GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\nUser-Agent: DevBox-Scanner\r\n"
+                       f"Accept: */*\r\nConnection: keep-alive\r\n\r\n")
+            writer.write(request.encode())
+            status_line = await asyncio.wait_for(reader.readline(), self.timeout)
+            if not status_line and reused:
+                # 空闲连接已被服务端关闭，换新连接重试
+                writer.close()
+                return await self._request(host, addr, port, tls, path)
+
+            result = {"tls_subject": None}
+            if tls:
+                ssl_obj = writer.get_extra_info("ssl_object")
+                der = ssl_obj.getpeercert(binary_form=True) if ssl_obj else None
+                result["tls_subject"] = cert_subject(der) if der else None
+            if not status_line.startswith(b"HTTP/"):
+                # 非 HTTP 服务：首行即为横幅 (SSH、SMTP、Redis 等)
+                result["banner"] = status_line.decode("utf-8", "replace").strip() or None
+                writer.close()
+                return result
+
+            headers = {}
+            for _ in range(100):
+                line = await asyncio.wait_for(reader.readline(), self.timeout)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body, reusable = await asyncio.wait_for(self._read_body(reader, headers), self.timeout)
+            title = TITLE_RE.search(body)
+
+            result.update({
+                "status": int(status_line.split()[1]),
+                "banner": headers.get("server"),
+                "title": html.unescape(title.group(1).decode("utf-8", "replace")).strip()[:80] if title else None,
+                "location": headers.get("location"),
+            })
+            if reusable and headers.get("connection", "").lower() != "close":
+                old = self.idle.pop(key, None)
+                if old:
+                    old[1].close()
+                self.idle[key] = (reader, writer)
+            else:
+                writer.close()
+            return result
+        except Exception:
+            writer.close()
+            raise
+
+    async def follow(self, host, addr, port, tls, location):
+        """
+        跟随一次跳转：相对路径沿用当前连接参数；绝对地址 (如 http -> https、换端口或换主机)
+        按目标重新确定 (地址, 端口, 协议)，连接同样经 _request 放回空闲池供后续复用。
+        """
+        if location.startswith("/"):
+            return await self._request(host, addr, port, tls, location)
+        target = urlsplit(location)
+        if target.scheme not in ("http", "https") or not target.hostname:
+            return None
+        next_tls = target.scheme == "https"
+        next_port = target.port or (443 if next_tls else 80)
+        next_addr = addr
+        if target.hostname != host:
+            infos = await asyncio.wait_for(asyncio.get_running_loop().getaddrinfo(
+                target.hostname, next_port, type=socket.SOCK_STREAM), self.timeout)
+            next_addr = infos[0][4][0]
+        path = (target.path or "/") + (f"?{target.query}" if target.query else "")
+        return await self._request(target.hostname, next_addr, next_port, next_tls, path)
+
+    async def fetch(self, host, addr, port, tls):
+        """对单个协议发起探测，遇到跳转时再跟随一次以获取标题；跟随失败时保留首个响应"""
+        async with self.sem:
+            try:
+                result = await self._request(host, addr, port, tls, "/")
+            except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError, ValueError, IndexError):
+                return None
+            location = result.get("location") or ""
+            if 300 <= (result.get("status") or 0) < 400 and location:
+                try:
+                    followed = await self.follow(host, addr, port, tls, location)
+                    if followed:
+                        result["title"] = followed.get("title") or result.get("title")
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, OSError, ValueError, IndexError,
+                        UnicodeError):
+                    pass
+            return result
+
+    async def probe(self, host, addr, port):
+        """并行尝试 TLS 与明文，合并为一条结果 (两者都是 HTTP 时优先 https)"""
+        plain, secure = await asyncio.gather(self.fetch(host, addr, port, False),
+                                             self.fetch(host, addr, port, True))
+        info = {"http_status": None, "url": None, "banner": None, "title": None, "tls_subject": None}
+        for scheme, res in (("http", plain), ("https", secure)):
+            if not res:
+                continue
+            if res.get("status"):
+                info.update(http_status=res["status"], url=f"{scheme}://{host}:{port}", title=res.get("title"))
+            info["banner"] = res.get("banner") or info["banner"]
+            info["tls_subject"] = res.get("tls_subject") or info["tls_subject"]
+        return info
+
+class AdaptiveTimeout:
+    """
+    参照 TCP 重传超时 (RFC 6298) 的平滑 RTT 估计：
+    以成功连接与被拒绝 (RST) 的往返时间为样本，超时取 srtt + 4 * rttvar。
+    """
+    def __init__(self, initial, floor=0.2):
+        self.ceiling = initial
+        self.floor = floor
+        self.srtt = None
+        self.rttvar = None
+
+    def sample(self, rtt):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt = 0.875 * self.srtt + 0.125 * rtt
+
+    @property
+    def value(self):
+        if self.srtt is None:
+            return self.ceiling
+        return min(self.ceiling, max(self.floor, self.srtt + 4 * self.rttvar))
+
+def raise_fd_limit(wanted):
+    """高并发时尝试提高进程可打开的文件描述符上限 (仅类 Unix 系统)"""
     try:
-        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-            s.settimeout(0.8)
-            if s.connect_ex((target, port)) == 0:
-                return port
-    except:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        target = wanted + 64
+        if soft != resource.RLIM_INFINITY and soft < target:
+            new_soft = target if hard == resource.RLIM_INFINITY else min(target, hard)
+            resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+            return new_soft - 64
+        return wanted
+    except Exception:
+        return wanted
+
+async def connect_once(addr, port, wait):
+    """单次非阻塞连接，返回 (状态, RTT)；状态为 open / closed / timeout"""
+    loop = asyncio.get_running_loop()
+    family = socket.AF_INET6 if ":" in addr else socket.AF_INET
+    start = time.perf_counter()
+    with socket.socket(family, socket.SOCK_STREAM) as s:
+        s.setblocking(False)
+        try:
+            await asyncio.wait_for(loop.sock_connect(s, (addr, port)), wait)
+            return "open", time.perf_counter() - start
+        except ConnectionRefusedError:
+            return "closed", time.perf_counter() - start
+        except (asyncio.TimeoutError, OSError):
+            return "timeout", None
+
+async def check_port(addr, port, timeout):
+    """
+    检查 TCP 端口是否开放，返回 (是否开放, RTT 秒数或 None)。
+    等待时间取自适应超时；只有超时回调明显晚到 (事件循环繁忙，应答可能已到达却未及时处理) 时，
+    才以初始超时重试一次，被过滤的端口不会在自适应超时之外再等一次完整的初始超时。
+    """
+    wait = timeout.value
+    start = time.perf_counter()
+    state, rtt = await connect_once(addr, port, wait)
+    late = time.perf_counter() - start > wait + LOOP_LAG_TOLERANCE
+    if state == "timeout" and wait < timeout.ceiling and late:
+        state, rtt = await connect_once(addr, port, timeout.ceiling)
+    if rtt is not None:
+        # 被拒绝 (RST) 同样是一次完整往返，可作为 RTT 样本
+        timeout.sample(rtt)
+    return state == "open", rtt
+
+def iter_targets(spec, max_hosts=MAX_HOSTS):
+    """
+    逐个产出目标描述中的主机，支持：
+    逗号分隔、CIDR (10.0.0.0/24)、末段范围 (10.0.0.1-20)、完整范围 (10.0.0.1-10.0.0.20) 与域名。
+    展开前先检查每个网段/范围的大小，超过 max_hosts 时直接报错，不会逐个生成 (如 IPv6 /64)。
+    """
+    for part in spec.replace("\n", ",").split(","):
+        part = part.strip()
+        if not part or part.startswith("#"):
+            continue
+        if "/" in part:
+            net = ipaddress.ip_network(part, strict=False)
+            if net.num_addresses > max_hosts:
+                raise ValueError(f"网段 {part} 包含 {net.num_addresses} 个地址，超过上限 {max_hosts} (可用 --max-hosts 调整)")
+            yield from (str(h) for h in (net.hosts() if net.num_addresses > 2 else net))
+        elif "-" in part and part.split("-")[0].count(".") == 3 and part.replace(".", "").replace("-", "").isdigit():
+            first, last = part.split("-", 1)
+            start = ipaddress.IPv4Address(first)
+            end = ipaddress.IPv4Address(last) if "." in last else ipaddress.IPv4Address(first.rsplit(".", 1)[0] + "." + last)
+            if int(end) - int(start) + 1 > max_hosts:
+                raise ValueError(f"范围 {part} 包含 {int(end) - int(start) + 1} 个地址，超过上限 {max_hosts} (可用 --max-hosts 调整)")
+            yield from (str(ipaddress.IPv4Address(i)) for i in range(int(start), int(end) + 1))
+        else:
+            yield part
+
+def expand_targets(spec, max_hosts=MAX_HOSTS):
+    """展开为去重后的主机列表 (保持顺序)，总数超过 max_hosts 时报错"""
+    hosts = {}
+    for host in iter_targets(spec, max_hosts):
+        hosts[host] = None
+        if len(hosts) > max_hosts:
+            raise ValueError(f"目标总数超过上限 {max_hosts} (可用 --max-hosts 调整)")
+    return list(hosts)
+
+def load_hosts_file(path, max_hosts=MAX_HOSTS):
+    with open(path, "r", encoding="utf-8") as f:
+        return expand_targets("\n".join(line.split("#")[0] for line in f), max_hosts)
+
+class HostState:
+    """单个主机的扫描进度：独立的自适应超时、并发上限与令牌桶限速"""
+    def __init__(self, target, addr, ports, initial_timeout, per_host, rate):
+        self.target = target
+        self.addr = addr
+        self.ports = iter(ports)
+        self.exhausted = False
+        self.timeout = AdaptiveTimeout(initial_timeout)
+        self.per_host = per_host
+        self.rate = rate
+        self.tokens = float(min(per_host, rate)) if rate else 0.0
+        self.last_refill = time.perf_counter()
+        self.in_flight = 0
+        self.followups = set()
+        self.open_ports = []
+        self.started = time.perf_counter()
+
+    def refill(self, now):
+        if self.rate:
+            self.tokens = min(max(1.0, self.rate), self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+
+    def ready_in(self, now):
+        """距离可以发起下一个连接还需等待的秒数，0 表示立即可发起"""
+        if self.exhausted or self.in_flight >= self.per_host:
+            return None
+        if not self.rate or self.tokens >= 1:
+            return 0
+        return (1 - self.tokens) / self.rate
+
+    def next_port(self):
+        for port in self.ports:
+            if self.rate:
+                self.tokens -= 1
+            return port
+        self.exhausted = True
         return None
 
+    @property
+    def finished(self):
+        return self.exhausted and self.in_flight == 0 and not self.followups
+
+async def resolve_hosts(targets, on_error):
+    """并发解析所有目标，返回 [(目标, IP)]，解析失败的目标交给 on_error"""
+    loop = asyncio.get_running_loop()
+
+    async def resolve(target):
+        try:
+            infos = await loop.getaddrinfo(target, None, type=socket.SOCK_STREAM)
+            return target, infos[0][4][0]
+        except (socket.gaierror, UnicodeError) as e:
+            # 非法主机名 (如标签超过 63 个字符) 在 IDNA 编码阶段即抛出 UnicodeError
+            on_error(target, e)
+            return target, None
+
+    results = await asyncio.gather(*(resolve(t) for t in targets))
+    return [(t, addr) for t, addr in results if addr]
+
+async def scan_hosts(targets, port_source, concurrency, initial_timeout, per_host, rate,
+                     on_open, on_host_done, on_error, on_closed=None):
+    """
+    多主机调度引擎：所有 (主机, 端口) 共享一个最多 concurrency 个连接的窗口，
+    按主机轮询分配名额，并受单主机并发上限与令牌桶限速约束，
+    慢主机只会占用自己的名额，不会拖住其他主机。
+    per_host 为 None 时：单个主机可用满整个窗口，多个主机时每台最多 DEFAULT_PER_HOST 个。
+    port_source(目标) 返回该主机待扫描的端口 (可跳过已完成/缓存未过期的端口)。
+    发现开放端口立即交给 on_open 处理，未开放的端口交给 on_closed；
+    某主机全部完成时调用 on_host_done。
+    """
+    resolved = await resolve_hosts(targets, on_error)
+    if per_host is None:
+        per_host = DEFAULT_PER_HOST if len(resolved) > 1 else concurrency
+    hosts = [HostState(t, addr, port_source(t), initial_timeout, per_host, rate) for t, addr in resolved]
+    active = list(hosts)
+    pending = set()
+    cursor = 0
+
+    async def probe(host, port):
+        try:
+            is_open, rtt = await check_port(host.addr, port, host.timeout)
+            if is_open:
+                task = asyncio.ensure_future(on_open(host, port, rtt))
+                host.followups.add(task)
+                task.add_done_callback(lambda t: (host.followups.discard(t), finish(host)))
+            elif on_closed:
+                on_closed(host, port)
+        finally:
+            host.in_flight -= 1
+            finish(host)
+
+    def finish(host):
+        if host.finished and host in active:
+            active.remove(host)
+            on_host_done(host)
+
+    def fill():
+        """按主机轮询补满窗口 (每轮每台主机至多一个名额)，返回限速主机最近需要等待的秒数"""
+        nonlocal cursor
+        wait = None
+        now = time.perf_counter()
+        progressed = True
+        while progressed and active and len(pending) < concurrency:
+            progressed = False
+            cursor %= len(active)
+            for host in active[cursor:] + active[:cursor]:
+                if len(pending) >= concurrency:
+                    break
+                host.refill(now)
+                delay = host.ready_in(now)
+                port = host.next_port() if delay == 0 else None
+                if port is None:
+                    if delay:
+                        wait = delay if wait is None else min(wait, delay)
+                    finish(host)
+                    continue
+                host.in_flight += 1
+                pending.add(asyncio.ensure_future(probe(host, port)))
+                progressed = True
+            cursor += 1
+        return wait
+
+    while active:
+        wait = fill()
+        waiters = pending | {t for h in active for t in h.followups}
+        if not waiters and wait is None:
+            break
+        done, _ = await asyncio.wait(waiters or [asyncio.ensure_future(asyncio.sleep(wait))],
+                                     timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+        pending.difference_update(done)
+    return hosts
+
+# 端口空间 (0-65535) 与命名端口组，可在 --ports 中直接引用 (如 top100,!22)
+PORT_SPACE = 65536
+PORT_PROFILES = {
+    "top100": "7,9,13,21-23,25-26,37,53,79-81,88,106,110-111,113,119,135,139,143-144,179,199,389,427,"
+              "443-445,465,513-515,543-544,548,554,587,631,646,873,990,993,995,1025-1029,1110,1433,"
+              "1720,1723,1755,1900,2000-2001,2049,2121,2717,3000,3128,3306,3389,3986,4899,5000,5009,"
+              "5051,5060,5101,5190,5357,5432,5631,5666,5800,5900,6000-6001,6646,7070,8000,8008-8009,"
+              "8080-8081,8443,8888,9100,9999-10000,32768,49152-49157",
+    "web": "80-81,443,591,2082-2083,3000,4443,5000,5173,8000,8008,8080-8081,8088,8443,8888,9000,9443",
+    "db": "1433,1521,3306,5432,5984,6379,7474,8086,9042,9200,11211,27017-27018,28015",
+    "all": "1-65535",
+}
+# 随机顺序使用的 Feistel 置换轮数：每台主机的种子派生出各轮密钥，顺序互不相关
+FEISTEL_ROUNDS = 4
+
+class PortSet:
+    """
+    端口集合：以 8KB 位图表示 0-65535，支持并/差运算、范围字符串互转，
+    并可按升序或伪随机顺序惰性产出端口，多主机 × 全端口扫描时不再生成整数列表。
+    """
+    def __init__(self, ports=()):
+        self.bits = bytearray(PORT_SPACE // 8)
+        self._members = None
+        for p in ports:
+            self.add(p)
+
+    @classmethod
+    def parse(cls, spec):
+        """
+        解析端口描述：端口 (80)、范围 (8000-8100)、命名端口组 (top100/web/db/all)，
+        以 ! 开头的项表示排除 (如 top100,8000-8100,!22)。非法输入抛出 ValueError。
+        """
+        include, exclude = cls(), cls()
+        for part in filter(None, (x.strip() for x in spec.split(","))):
+            target = exclude if part.startswith("!") else include
+            part = part.lstrip("!").strip()
+            profile = PORT_PROFILES.get(part.lower())
+            if profile:
+                target.update(cls.parse(profile))
+                continue
+            s, sep, e = part.partition("-")
+            try:
+                start, end = int(s), int(e) if sep else int(s)
+            except ValueError:
+                raise ValueError(f"无法识别的端口或端口组: {part}") from None
+            if not 1 <= start <= end <= 65535:
+                raise ValueError(f"端口超出范围 (1-65535): {part}")
+            target.add_range(start, end)
+        return include - exclude
+
+    def add(self, port):
+        self.bits[port >> 3] |= 1 << (port & 7)
+        self._members = None
+
+    def add_range(self, start, end):
+        """置位 [start, end]：首尾不足一个字节的部分逐位处理，中间整字节批量赋值"""
+        lo, hi = (start + 7) >> 3, (end + 1) >> 3
+        if lo >= hi:
+            for p in range(start, end + 1):
+                self.add(p)
+            return
+        for p in list(range(start, lo << 3)) + list(range(hi << 3, end + 1)):
+            self.add(p)
+        self.bits[lo:hi] = b"\xff" * (hi - lo)
+        self._members = None
+
+    def update(self, other):
+        self.bits = bytearray(a | b for a, b in zip(self.bits, other.bits))
+        self._members = None
+
+    def __sub__(self, other):
+        result = PortSet()
+        result.bits = bytearray(a & ~b & 0xff for a, b in zip(self.bits, other.bits))
+        return result
+
+    def __contains__(self, port):
+        return 0 <= port < PORT_SPACE and bool(self.bits[port >> 3] >> (port & 7) & 1)
+
+    def __len__(self):
+        return bin(int.from_bytes(self.bits, "little")).count("1")
+
+    def __bool__(self):
+        return any(self.bits)
+
+    def __iter__(self):
+        """升序产出端口，跳过全零字节"""
+        for i, byte in enumerate(self.bits):
+            if byte:
+                for b in range(8):
+                    if byte >> b & 1:
+                        yield (i << 3) + b
+
+    def shuffled(self, seed=None):
+        """
+        以伪随机顺序产出端口：以种子派生的密钥在 2 的幂大小的下标空间上做平衡 Feistel 置换，
+        跳过超出成员数的下标 (cycle-walking)。不同种子得到的是不同的置换，而不是同一序列的平移。
+        成员表 (array('H')) 只生成一次，多台主机共用。
+        """
+        if self._members is None:
+            self._members = array("H", self)
+        members = self._members
+        n = len(members)
+        bits = max(2, (n - 1).bit_length())
+        half = (bits + 1) // 2
+        mask = (1 << half) - 1
+        rng = random.Random(seed)
+        keys = [rng.getrandbits(32) for _ in range(FEISTEL_ROUNDS)]
+        for i in range(1 << (2 * half)):
+            left, right = i >> half, i & mask
+            for key in keys:
+                f = ((right ^ key) * 0x45D9F3B) & 0xFFFFFFFF
+                left, right = right, left ^ ((f ^ (f >> 16)) & mask)
+            x = (left << half) | right
+            if x < n:
+                yield members[x]
+
+    def to_spec(self):
+        """压缩为范围字符串 (如 1-79,81-442)，用于断点与缓存文件"""
+        parts = []
+        start = prev = None
+        for p in self:
+            if prev is not None and p == prev + 1:
+                prev = p
+                continue
+            if start is not None:
+                parts.append(f"{start}-{prev}" if prev != start else str(start))
+            start = prev = p
+        if start is not None:
+            parts.append(f"{start}-{prev}" if prev != start else str(start))
+        return ",".join(parts)
+
+def get_root_dir():
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__ + "/../"))
+
+CACHE_PATH = os.path.join(get_root_dir(), "core", "portscan_cache.json")
+
+def write_json(path, data):
+    """原子写入，避免中断时留下半截文件"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+class ScanState:
+    """
+    记录每台主机已完成的端口与开放端口的结果，
+    用于断点续扫 (--checkpoint) 与带有效期的结果缓存 (--cache-ttl)。
+    """
+    def __init__(self, meta=None):
+        self.meta = meta or {}
+        self.done = {}      # 目标 -> 已完成的端口 (PortSet)
+        self.records = {}   # 目标 -> {端口: 开放端口记录}
+
+    def mark(self, target, port, record=None):
+        self.done.setdefault(target, PortSet()).add(port)
+        if record is not None:
+            self.records.setdefault(target, {})[port] = record
+
+    def pending(self, target, ports):
+        done = self.done.get(target)
+        return ports if not done else (p for p in ports if p not in done)
+
+    def save_checkpoint(self, path):
+        write_json(path, {
+            "meta": self.meta,
+            "done": {t: ports.to_spec() for t, ports in self.done.items()},
+            "records": {t: list(recs.values()) for t, recs in self.records.items()},
+        })
+
+    @classmethod
+    def load_checkpoint(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        state = cls(data.get("meta"))
+        for t, spec in data.get("done", {}).items():
+            state.done[t] = PortSet.parse(spec)
+        for t, recs in data.get("records", {}).items():
+            state.records[t] = {r["port"]: r for r in recs}
+        return state
+
+class ResultCache:
+    """
+    按主机缓存扫描结果：未开放端口按批次以范围字符串保存，开放端口保存完整记录。
+    在 TTL 内重复扫描时，只有状态已过期的端口会被重新探测。
+    """
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.now = time.time()
+        self.data = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self.data = json.load(f).get("hosts", {})
+        except (OSError, ValueError):
+            pass
+
+    def fresh(self, target):
+        """返回 (未过期的未开放端口集合, 未过期的开放端口记录 {端口: 记录})"""
+        entry = self.data.get(target, {})
+        states = {}
+        for ts, spec in sorted(entry.get("closed", [])):
+            if self.now - ts <= self.ttl:
+                states.update(dict.fromkeys(PortSet.parse(spec), (ts, None)))
+        for port, (ts, record) in entry.get("open", {}).items():
+            port = int(port)
+            if self.now - ts <= self.ttl and ts >= states.get(port, (0, None))[0]:
+                states[port] = (ts, record)
+        closed = {p for p, (_, r) in states.items() if r is None}
+        opened = {p: r for p, (_, r) in states.items() if r is not None}
+        return closed, opened
+
+    def update(self, state):
+        """并入本次扫描结果并丢弃过期条目后写回"""
+        now = time.time()
+        for target, ports in state.done.items():
+            entry = self.data.setdefault(target, {"closed": [], "open": {}})
+            records = state.records.get(target, {})
+            closed = ports - PortSet(records)
+            if closed:
+                entry["closed"].append([now, closed.to_spec()])
+            for port in ports:
+                entry["open"].pop(str(port), None)
+            for port, record in records.items():
+                entry["open"][str(port)] = [now, record]
+            entry["closed"] = [b for b in entry["closed"] if now - b[0] <= self.ttl]
+            entry["open"] = {p: v for p, v in entry["open"].items() if now - v[0] <= self.ttl}
+        try:
+            write_json(self.path, {"hosts": self.data})
+        except OSError:
+            pass
+
+# 机器可读输出的字段顺序
+RECORD_FIELDS = ["host", "ip", "port", "latency_ms", "http_status", "url", "banner", "title", "tls_subject", "cached"]
+
+class RecordWriter:
+    """逐条写出扫描记录 (JSON Lines / CSV)，每条立即 flush，不在内存中累积"""
+    def __init__(self, fmt, stream):
+        self.fmt = fmt
+        self.stream = stream
+        self.csv = None
+        if fmt == "csv":
+            self.csv = csv.DictWriter(stream, fieldnames=RECORD_FIELDS, lineterminator="\n")
+            self.csv.writeheader()
+
+    def write(self, record):
+        if self.csv:
+            self.csv.writerow(record)
+        else:
+            self.stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.stream.flush()
+
 def run_portscan(args, tools):
     import questionary
     Fore = tools["Fore"]
-    ping_func = tools["ping"]
 
-    print(f"{Fore.CYAN}🔍 DevBox PortScan Pro - 深度诊断与访问")
+    # 机器可读模式：记录写 stdout，其余提示信息写 stderr，且不发起任何交互
+    output = getattr(args, 'output', None)
+    writer = RecordWriter(output, sys.stdout) if output else None
+    log_stream = sys.stderr if writer else sys.stdout
+    def log(*values, **kwargs):
+        print(*values, file=log_stream, **kwargs)
+
+    log(f"{Fore.CYAN}🔍 DevBox PortScan Pro - 深度诊断与访问")
     
     target = getattr(args, 'target', None)
-    if not target:
+    hosts_file = getattr(args, 'hosts_file', None)
+    if not target and not hosts_file and not writer:
         target = questionary.text("请输入诊断目标:", default="127.0.0.1").ask()
 
+    try:
+        max_hosts = max(1, getattr(args, 'max_hosts', MAX_HOSTS) or MAX_HOSTS)
+        targets = expand_targets(target or "", max_hosts)
+        if hosts_file:
+            known = set(targets)
+            targets += [h for h in load_hosts_file(hosts_file, max_hosts) if h not in known]
+            if len(targets) > max_hosts:
+                raise ValueError(f"目标总数超过上限 {max_hosts} (可用 --max-hosts 调整)")
+    except (OSError, ValueError) as e:
+        log(f"{Fore.RED}[错误] 目标解析失败: {e}")
+        return
+    if not targets:
+        log(f"{Fore.RED}[错误] 未提供有效的诊断目标。")
+        return
+    multi = len(targets) > 1
+
     # 1. 动态选择检查项
     check_types = ["ping", "ports", "http"]
-    if len(sys.argv) == 1:
+    if len(sys.argv) == 1 and not writer:
         check_types = questionary.checkbox(
             "请选择检查项目:",
             choices=[
-                questionary.Choice("Ping 测试 (ICMP)", "ping", checked=True),
+                questionary.Choice("Ping 测试 (ICMP/TCP/UDP)", "ping", checked=True),
                 questionary.Choice("端口扫描与 Web 验证", "ports", checked=True),
             ]
         ).ask()
 
-    print("-" * 62)
+    log("-" * 62)
 
-    # --- Ping 阶段 ---
+    # --- Ping 阶段 (多主机并发执行) ---
     if "ping" in check_types:
-        delay = ping_func(target, timeout=1)
-        if delay:
-            print(f"{Fore.GREEN}[在线] Ping 响应: {delay*1000:.2f} ms")
-        else:
-            print(f"{Fore.RED}[离线] ICMP 无响应")
-        print()
+        try:
+            ping_func = tools["probe"].get_backend(getattr(args, 'ping', 'auto'))
+        except ValueError as e:
+            log(f"{Fore.RED}❌ {e}")
+            return
+        with ThreadPoolExecutor(max_workers=min(64, len(targets))) as executor:
+            futures = {executor.submit(ping_func, t, timeout=1): t for t in targets}
+            for future in as_completed(futures):
+                host = futures[future]
+                label = f"{host:<15} " if multi else ""
+                try:
+                    delay = future.result()
+                except Exception:
+                    delay = None
+                if delay:
+                    log(f"{Fore.GREEN}[在线] {label}Ping 响应 ({ping_func.name}): {delay*1000:.2f} ms")
+                else:
+                    log(f"{Fore.RED}[离线] {label}{ping_func.name.upper()} 无响应")
+        log()
 
     # --- 扫描阶段 ---
     port_input = getattr(args, 'ports', None)
     if not port_input:
-        port_input = questionary.text("端口范围:", default="80,443,8000,8080,3000").ask()
+        if writer:
+            port_input = "80,443,8000,8080,3000"
+        else:
+            port_input = questionary.text("端口范围:", default="80,443,8000,8080,3000").ask()
 
     if port_input:
-        ports = []
-        for part in port_input.split(','):
-            if '-' in part:
-                s, e = map(int, part.split('-'))
-                ports.extend(range(s, e + 1))
-            else:
-                ports.append(int(part))
+        try:
+            ports = PortSet.parse(port_input)
+        except ValueError as e:
+            log(f"{Fore.RED}❌ 端口参数错误: {e}")
+            return
+        if not ports:
+            log(f"{Fore.YELLOW}端口集合为空，无需扫描。")
+            return
+        randomize = getattr(args, 'randomize', False)
 
         web_urls = [] # 用于存储发现的可用网址
-        
-        def diagnostic_worker(p):
-            is_open = check_port(target, p)
-            if is_open:
-                code, url = check_http(target, p)
-                return {"port": p, "code": code, "url": url}
-            return None
+        concurrency = raise_fd_limit(max(1, getattr(args, 'concurrency', 500) or 500))
+        initial_timeout = getattr(args, 'timeout', 0.8) or 0.8
+        per_host = getattr(args, 'per_host', None)
+        per_host = max(1, per_host) if per_host else None
+        rate = max(0.0, getattr(args, 'rate', 0) or 0)
+        probe_limit = max(1, getattr(args, 'probe_concurrency', 50) or 50)
+        probe_timeout = getattr(args, 'probe_timeout', 1.5) or 1.5
+        probes = []  # 探测池需在事件循环内创建
+
+        # --- 断点续扫与结果缓存 ---
+        checkpoint = getattr(args, 'checkpoint', None)
+        cache_ttl = max(0.0, getattr(args, 'cache_ttl', 0) or 0)
+        meta = {"targets": target or "", "hosts_file": hosts_file or "", "ports": port_input}
+        state = ScanState(meta)
+        if checkpoint and os.path.exists(checkpoint):
+            try:
+                loaded = ScanState.load_checkpoint(checkpoint)
+                if loaded.meta == meta:
+                    state = loaded
+                    log(f"{Fore.YELLOW}[续扫] 从断点恢复，已完成 {sum(map(len, state.done.values()))} 个端口")
+                else:
+                    log(f"{Fore.YELLOW}[续扫] 断点文件与本次参数不一致，将重新开始")
+            except (OSError, ValueError, KeyError) as e:
+                log(f"{Fore.YELLOW}[续扫] 断点文件无法读取 ({e})，将重新开始")
+        cache = ResultCache(CACHE_PATH, cache_ttl) if cache_ttl else None
+        skipped = {}  # 目标 -> 缓存中未过期、无需重新探测的端口
+
+        def report(record):
+            if writer:
+                writer.write(record)
+                return
+            label = f"{record['host']}:{record['port']:<5}" if multi else f"端口 {record['port']:<5}"
+            tag = "[缓存]" if record.get("cached") else "[开放]"
+            status = f"{Fore.GREEN}{tag} {label} | {record['latency_ms']:>7.2f} ms"
+            if record["http_status"]:
+                status += f" | {Fore.CYAN}HTTP {record['http_status']} | {record['url']}"
+                web_urls.append(record["url"])
+            if record["title"]:
+                status += f" | 标题: {record['title']}"
+            if record["banner"]:
+                status += f" | {Fore.WHITE}{record['banner']}"
+            if record["tls_subject"]:
+                status += f" | TLS: {record['tls_subject']}"
+            log(status, flush=True)
+
+        # 先输出断点中已发现、以及缓存中未过期的开放端口
+        for t in targets:
+            for record in state.records.get(t, {}).values():
+                report(record)
+            if cache:
+                closed, opened = cache.fresh(t)
+                skipped[t] = closed | set(opened)
+                for record in opened.values():
+                    report({**record, "cached": True})
+
+        def port_source(t):
+            skip = skipped.get(t)
+            todo = state.pending(t, ports.shuffled() if randomize else ports)
+            return todo if not skip else (p for p in todo if p not in skip)
+
+        async def on_open(host, p, rtt):
+            info = await probes[0].probe(host.target, host.addr, p)
+            host.open_ports.append(p)
+            record = {"host": host.target, "ip": host.addr, "port": p,
+                      "latency_ms": round(rtt * 1000, 3), **info, "cached": False}
+            state.mark(host.target, p, record)
+            report(record)
+
+        def on_closed(host, p):
+            state.mark(host.target, p)
+
+        def on_host_done(host):
+            if multi:
+                log(f"{Fore.WHITE}[完成] {host.target:<15} | 开放 {len(host.open_ports)} 个"
+                      f" | 用时 {time.perf_counter() - host.started:.2f}s"
+                      f" | 自适应超时 {host.timeout.value*1000:.0f} ms", flush=True)
+
+        def on_error(t, e):
+            log(f"{Fore.RED}[错误] 无法解析目标 {t}: {e}", flush=True)
+
+        async def autosave():
+            while True:
+                await asyncio.sleep(5)
+                state.save_checkpoint(checkpoint)
+
+        async def run_scan():
+            probes.append(ProbePool(probe_limit, probe_timeout))
+            saver = asyncio.ensure_future(autosave()) if checkpoint else None
+            try:
+                return await scan_hosts(targets, port_source, concurrency, initial_timeout, per_host, rate,
+                                        on_open, on_host_done, on_error, on_closed)
+            finally:
+                if saver:
+                    saver.cancel()
+                await probes[0].close()
 
-        with ThreadPoolExecutor(max_workers=20) as executor:
-            results = list(executor.map(diagnostic_worker, ports))
-            
-            for res in filter(None, results):
-                status = f"{Fore.GREEN}[开放] 端口 {res['port']:<5}"
-                if res['code']:
-                    status += f" | {Fore.CYAN}HTTP {res['code']} | {res['url']}"
-                    web_urls.append(res['url'])
-                print(status)
+        start = time.perf_counter()
+        try:
+            hosts = asyncio.run(run_scan())
+        except KeyboardInterrupt:
+            # 中断时保留已完成的部分：写入断点与缓存
+            if checkpoint:
+                state.save_checkpoint(checkpoint)
+                log(f"\n{Fore.YELLOW}[中断] 已保存断点到 {checkpoint}，以相同参数重新运行即可续扫。")
+            if cache:
+                cache.update(state)
+            raise
+        if checkpoint and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        if cache:
+            cache.update(state)
+        if hosts:
+            summary = f" | 自适应超时 {hosts[0].timeout.value*1000:.0f} ms" if not multi else ""
+            log(f"{Fore.WHITE}扫描 {len(hosts)} 台主机 × {len(ports)} 个端口用时 "
+                  f"{time.perf_counter() - start:.2f}s | 并发 {concurrency}{summary}")
 
         # --- 网址快捷访问逻辑 ---
-        if web_urls:
-            print("-" * 62)
+        if web_urls and not writer:
+            log("-" * 62)
             should_open = questionary.confirm("检测到 Web 服务，是否立即打开浏览器访问?").ask()
             if should_open:
                 if len(web_urls) == 1:
                     webbrowser.open(web_urls[0])
-                    print(f"✅ 已打开: {web_urls[0]}")
+                    log(f"✅ 已打开: {web_urls[0]}")
                 else:
                     to_open = questionary.select(
                         "请选择要访问的网址:",
@@ -116,6 +950,6 @@ def run_portscan(args, tools):
                     ).ask()
                     if to_open:
                         webbrowser.open(to_open)
-                        print(f"✅ 已打开: {to_open}")
+                        log(f"✅ 已打开: {to_open}")
     
-    print("-" * 62)
\ No newline at end of file
+    log("-" * 62)
\ No newline at end of file
@@ -4,7 +4,9 @@ import os
 
 __info__ = {
     "help": "沉浸式专注倒计时",
-    "alias": ["tick", "timer"]
+    "alias": ["tick", "timer"],
+    "deps": ["questionary", "plyer"],
+    "daemon": False  # 交互式倒计时，始终在本地执行
 }
 
 def setup_args(parser):
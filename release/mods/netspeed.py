@@ -1,61 +1,544 @@
 import time
 import sys
-import ctypes
 import os
+import math
+import mmap
+import struct
+import threading
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 
-def is_admin():
-    """检查是否拥有管理员权限"""
-    try:
-        return ctypes.windll.shell32.IsUserAnAdmin()
-    except:
-        # 非 Windows 系统检查方式
-        return os.getuid() == 0 if hasattr(os, 'getuid') else False
+__info__ = {
+    "help": "多目标网络延迟实时监控",
+    "alias": ["ns"],
+    "deps": ["ping3"],
+    "daemon": False  # 持续监控，始终在本地执行
+}
+
+def setup_args(parser):
+    parser.add_argument("targets", nargs="*", help="监控目标，可同时指定多个 (默认 114.114.114.114)")
+    parser.add_argument("--interval", type=float, default=1.0, help="采样间隔 (秒)，支持小于 1 秒")
+    parser.add_argument("--timeout", type=float, default=2.0, help="单次探测超时 (秒)")
+    parser.add_argument("--probe", choices=["auto", "icmp", "tcp", "udp"], default="auto",
+                        help="探测方式：icmp 需管理员权限；tcp 测握手耗时、udp 测 DNS 查询耗时，普通用户可用 (默认 auto)")
+    parser.add_argument("--port", type=int, help="tcp/udp 探测的默认端口 (默认 443/53)，也可写成 目标:端口")
+    parser.add_argument("--window", type=int, default=300, help="滚动统计窗口的样本数")
+    parser.add_argument("--record", metavar="FILE", help="将每个样本追加写入二进制记录文件，便于事后分析")
+    parser.add_argument("--replay", metavar="FILE", help="读取记录文件，输出各目标的统计、延迟分布与异常时段 (不进行监控)")
+
+# 表格中每个目标显示的最近样本数 (迷你走势图宽度)
+SPARK_WIDTH = 16
+SPARK_CHARS = "▁▂▃▄▅▆▇█"
+
+# 直方图：0.01 ms ~ 60 s 按 2% 的相对精度对数分桶 (约 800 个桶)，内存固定
+HIST_MIN_MS = 0.01
+HIST_MAX_MS = 60000.0
+HIST_PRECISION = 0.02
+# 退出时汇总展示的延迟区间 (毫秒)
+SUMMARY_EDGES = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000]
+
+def latency_color(Fore, ms):
+    # 根据延迟设置颜色
+    if ms is None:
+        return Fore.RED
+    if ms < 50:
+        return Fore.GREEN
+    if ms < 150:
+        return Fore.YELLOW
+    return Fore.RED
+
+class RingBuffer:
+    """定长环形缓冲 (array('d'))，丢包记为 NaN；长时间运行内存恒定"""
+    def __init__(self, capacity):
+        self.data = array("d", [math.nan]) * capacity
+        self.capacity = capacity
+        self.index = 0
+        self.count = 0
+
+    def append(self, value):
+        self.data[self.index] = math.nan if value is None else value
+        self.index = (self.index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def tail(self, n):
+        """按时间顺序返回最近 n 个样本 (NaN 表示丢包)"""
+        n = min(n, self.count)
+        start = (self.index - n) % self.capacity
+        if start + n <= self.capacity:
+            return self.data[start:start + n].tolist()
+        return (self.data[start:] + self.data[:self.index]).tolist()
+
+def percentile(ordered, q):
+    """ordered 需已排序"""
+    if not ordered:
+        return math.nan
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def window_stats(samples):
+    """窗口统计：min/avg/p50/p95/p99/max、抖动 (相邻成功样本差值的平均) 与丢包率"""
+    values = [v for v in samples if not math.isnan(v)]
+    ordered = sorted(values)
+    diffs = [abs(b - a) for a, b in zip(values, values[1:])]
+    return {
+        "min": ordered[0] if ordered else math.nan,
+        "avg": sum(values) / len(values) if values else math.nan,
+        "p50": percentile(ordered, 0.50),
+        "p95": percentile(ordered, 0.95),
+        "p99": percentile(ordered, 0.99),
+        "max": ordered[-1] if ordered else math.nan,
+        "jitter": sum(diffs) / len(diffs) if diffs else math.nan,
+        "loss": (len(samples) - len(values)) / len(samples) * 100 if samples else math.nan,
+    }
+
+class LatencyHistogram:
+    """
+    HDR 风格的对数分桶直方图：覆盖 HIST_MIN_MS ~ HIST_MAX_MS，桶宽为相对精度 2%，
+    计数存放在定长 array 中；整个运行期间的分位数误差不超过桶宽。
+    """
+    def __init__(self):
+        self.log_base = math.log1p(HIST_PRECISION)
+        self.counts = array("L", [0]) * (self.bucket(HIST_MAX_MS) + 1)
+        self.total = 0
+        self.min = math.inf
+        self.max = 0.0
+
+    def bucket(self, ms):
+        ms = min(max(ms, HIST_MIN_MS), HIST_MAX_MS)
+        return int(math.log(ms / HIST_MIN_MS) / self.log_base)
+
+    def lower(self, index):
+        """桶的下界 (毫秒)"""
+        return HIST_MIN_MS * math.exp(index * self.log_base)
+
+    def record(self, ms):
+        self.counts[self.bucket(ms)] += 1
+        self.total += 1
+        self.min = min(self.min, ms)
+        self.max = max(self.max, ms)
+
+    def percentile(self, q):
+        """返回所在桶的上界，并限制在实际观测到的 [min, max] 内"""
+        if not self.total:
+            return math.nan
+        rank = max(1, math.ceil(q * self.total))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return max(self.min, min(self.lower(i + 1), self.max))
+        return self.max
+
+    def ranges(self, edges):
+        """按给定边界 (毫秒) 汇总计数，返回 [(标签, 计数)]"""
+        result = [0] * (len(edges) + 1)
+        for i, n in enumerate(self.counts):
+            if n:
+                low = self.lower(i)
+                result[sum(1 for e in edges if low >= e)] += n
+        labels = [f"< {edges[0]} ms"] + [f"{a}-{b} ms" for a, b in zip(edges, edges[1:])] + [f"≥ {edges[-1]} ms"]
+        return list(zip(labels, result))
+
+class TargetState:
+    """单个目标的滚动窗口样本、全程直方图与计数"""
+    def __init__(self, target, window):
+        self.target = target
+        self.samples = RingBuffer(window)  # 毫秒，NaN 表示丢包
+        self.histogram = LatencyHistogram()
+        self.sent = 0
+        self.lost = 0
+        self.last = None
+
+    def record(self, ms):
+        self.sent += 1
+        if ms is None:
+            self.lost += 1
+        else:
+            self.histogram.record(ms)
+        self.last = ms
+        self.samples.append(ms)
+
+    def stats(self):
+        return window_stats(self.samples.tail(self.samples.capacity))
+
+    def sparkline(self):
+        recent = self.samples.tail(SPARK_WIDTH)
+        values = [v for v in recent if not math.isnan(v)]
+        top = max(values) if values else 1
+        chars = []
+        for v in recent:
+            if math.isnan(v):
+                chars.append("✕")
+            else:
+                chars.append(SPARK_CHARS[min(len(SPARK_CHARS) - 1, int(v / max(top, 1e-9) * (len(SPARK_CHARS) - 1)))])
+        return "".join(chars)
+
+# 记录文件格式：每次监控先写一个会话头 (目标名称表)，之后是定长样本记录
+#   会话头: 'S' + <4sHH (魔数 NSPD, 版本, 目标数) + 每个目标 <B 长度 + UTF-8 名称
+#   样本:   <BHdf (标记 0x01, 目标序号, 时间戳秒, 延迟毫秒；丢包为 NaN)，15 字节
+RECORD_MAGIC = b"NSPD"
+RECORD_VERSION = 1
+TAG_SESSION = ord("S")
+TAG_SAMPLE = 0x01
+SESSION_HEADER = struct.Struct("<4sHH")
+SAMPLE = struct.Struct("<BHdf")
+# 回放时列出的异常时段数 (按分钟聚合)
+REPLAY_TOP_MINUTES = 10
+# 慢样本阈值：p50 + k × (p90 - p50)，且至少为 p50 的 1.5 倍；
+# p50/p90 不会被少于全程 10% 的异常时段拉高，阈值不随故障本身漂移
+SLOW_SPREAD_K = 3.0
+SLOW_MIN_FACTOR = 1.5
+# 异常时段的显著性：按分钟做二项检验 (该分钟的丢包/慢样本数相对全程比例的右尾概率)，
+# 所有分钟合计的误报概率约为该值 (Bonferroni 校正)
+ANOMALY_ALPHA = 0.01
+
+class Recorder:
+    """追加写入样本记录；由调用方持有锁，缓冲区每个采样周期刷新一次"""
+    def __init__(self, path, targets):
+        self.f = open(path, "ab")
+        # 上次运行被中断时末尾可能留下残缺记录，先截断到最后一条完整记录，避免新会话错位
+        end = valid_length(path)
+        if end < self.f.tell():
+            self.f.truncate(end)
+        self.index = {t: i for i, t in enumerate(targets)}
+        header = bytes([TAG_SESSION]) + SESSION_HEADER.pack(RECORD_MAGIC, RECORD_VERSION, len(targets))
+        for t in targets:
+            name = t.encode("utf-8")[:255]
+            header += bytes([len(name)]) + name
+        self.f.write(header)
+
+    def write(self, target, ts, ms):
+        self.f.write(SAMPLE.pack(TAG_SAMPLE, self.index[target], ts, math.nan if ms is None else ms))
+
+    def flush(self):
+        self.f.flush()
+
+    def close(self):
+        self.f.close()
+
+def binomial_tail(k, n, p):
+    """二项分布右尾 P(X >= k)，X ~ B(n, p)；用对数概率求和，避免大 n 时溢出"""
+    if k <= 0:
+        return 1.0
+    if p <= 0:
+        return 0.0
+    if p >= 1:
+        return 1.0
+    log_p, log_q = math.log(p), math.log1p(-p)
+    base = math.lgamma(n + 1)
+    return min(1.0, sum(math.exp(base - math.lgamma(i + 1) - math.lgamma(n - i + 1) + i * log_p + (n - i) * log_q)
+                        for i in range(k, n + 1)))
+
+class RecordError(ValueError):
+    """记录文件损坏，pos 为出错位置的偏移"""
+    def __init__(self, pos, reason):
+        super().__init__(f"记录文件已损坏：{reason} (偏移 {pos})")
+        self.pos = pos
+
+def iter_records(data, pos=0):
+    """
+    从 pos 开始逐条解析记录：会话头产出 (结束偏移, None, None, None)，样本产出 (结束偏移, 目标, 时间戳, 毫秒或 None)。
+    遇到残缺或损坏的数据抛出 RecordError (带出错偏移)。
+    """
+    names = []
+    size = len(data)
+    while pos < size:
+        tag = data[pos]
+        if tag == TAG_SESSION:
+            if pos + 1 + SESSION_HEADER.size > size:
+                raise RecordError(pos, "会话头不完整")
+            magic, version, count = SESSION_HEADER.unpack_from(data, pos + 1)
+            if magic != RECORD_MAGIC or version != RECORD_VERSION:
+                raise RecordError(pos, "无法识别的会话头")
+            end = pos + 1 + SESSION_HEADER.size
+            session = []
+            for _ in range(count):
+                if end >= size or end + 1 + data[end] > size:
+                    raise RecordError(pos, "目标名称表不完整")
+                length = data[end]
+                session.append(data[end + 1:end + 1 + length].decode("utf-8", "replace"))
+                end += 1 + length
+            names, pos = session, end
+            yield pos, None, None, None
+        elif tag == TAG_SAMPLE:
+            if pos + SAMPLE.size > size:
+                raise RecordError(pos, "样本不完整")
+            _, idx, ts, ms = SAMPLE.unpack_from(data, pos)
+            if idx >= len(names):
+                raise RecordError(pos, "样本的目标序号无效")
+            pos += SAMPLE.size
+            yield pos, names[idx], ts, None if math.isnan(ms) else ms
+        else:
+            raise RecordError(pos, "未知的记录类型")
+
+def valid_length(path):
+    """文件开头连续完整记录的总长度 (字节)"""
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            end = 0
+            try:
+                for end, _, _, _ in iter_records(data):
+                    pass
+            except RecordError:
+                pass
+            return end
+
+def read_recording(path):
+    """
+    逐条产出 (目标, 时间戳, 毫秒或 None)；使用 mmap 读取，不把整个文件载入内存。
+    中途损坏 (如旧版本留下的残缺记录) 时跳到下一个会话头继续读取，之后再无会话头才报错；
+    末尾被中断的残缺记录直接忽略。
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            marker = bytes([TAG_SESSION]) + RECORD_MAGIC
+            start = 0
+            while True:
+                try:
+                    for _, target, ts, ms in iter_records(data, start):
+                        if target is not None:
+                            yield target, ts, ms
+                    return
+                except RecordError as e:
+                    start = data.find(marker, e.pos + 1)
+                    if start < 0:
+                        if len(data) - e.pos < SAMPLE.size and data[e.pos] == TAG_SAMPLE:
+                            return  # 末尾被中断的残缺记录
+                        raise
+
+def replay_recording(path, Fore, window):
+    """
+    汇总记录文件：每个目标的全程统计与直方图，以及按分钟聚合的异常时段。
+    第一遍建立全程分布，得到丢包率与慢样本阈值；第二遍 (mmap 重读) 按分钟计数，
+    丢包或慢样本数显著高于全程比例 (二项检验) 的分钟记为异常。
+    """
+    states = {}
+    first = last = None
+    for target, ts, ms in read_recording(path):
+        state = states.get(target)
+        if state is None:
+            state = states[target] = TargetState(target, window)
+        state.record(ms)
+        first = ts if first is None else min(first, ts)
+        last = ts if last is None else max(last, ts)
+
+    if not states:
+        print(f"{Fore.YELLOW}记录文件中没有样本。")
+        return
+    fmt = lambda t: time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(t))
+    print(f" 📼 记录文件: {path}")
+    print(f" 🕒 时间范围: {fmt(first)} ~ {fmt(last)} ({(last - first) / 60:.1f} 分钟)")
+    print_summary(states, Fore)
+
+    # 全程基准：丢包率与慢样本阈值 (由 p50/p90 推出，不受短时故障影响)
+    thresholds = {}
+    for t, st in states.items():
+        p50, p90 = st.histogram.percentile(0.50), st.histogram.percentile(0.90)
+        thresholds[t] = max(p50 + SLOW_SPREAD_K * (p90 - p50), p50 * SLOW_MIN_FACTOR)
+    minutes = {}  # (目标, 分钟) -> [样本数, 丢包数, 慢样本数, 最大延迟]
+    slow_total = dict.fromkeys(states, 0)
+    for target, ts, ms in read_recording(path):
+        bucket = minutes.setdefault((target, int(ts // 60)), [0, 0, 0, 0.0])
+        bucket[0] += 1
+        if ms is None:
+            bucket[1] += 1
+        elif ms > thresholds[target]:
+            bucket[2] += 1
+            slow_total[target] += 1
+        bucket[3] = max(bucket[3], ms or 0.0)
+
+    # 每分钟分别检验丢包与慢样本，取更显著的一项；阈值按检验次数校正，长记录不会因次数多而误报
+    alpha = ANOMALY_ALPHA / (2 * len(minutes))
+    anomalies = []
+    for (target, minute), (n, lost, slow, peak) in minutes.items():
+        st = states[target]
+        replied = n - lost
+        replied_total = st.sent - st.lost
+        p_loss = binomial_tail(lost, n, st.lost / st.sent)
+        p_slow = binomial_tail(slow, replied, slow_total[target] / replied_total) if replied else 1.0
+        if min(p_loss, p_slow) < alpha:
+            anomalies.append((min(p_loss, p_slow), target, minute, n, lost, slow, peak))
+    if not anomalies:
+        print(f"\n{Fore.GREEN} ✅ 未发现明显偏离全程水平的时段。")
+        return
+    anomalies.sort(key=lambda a: a[0])
+    print(f"\n{Fore.YELLOW} ⚠️  异常时段 (按分钟，丢包或慢样本显著多于全程水平，共 {len(anomalies)} 个，"
+          f"列出前 {REPLAY_TOP_MINUTES} 个):")
+    for _, target, minute, n, lost, slow, peak in anomalies[:REPLAY_TOP_MINUTES]:
+        st = states[target]
+        print(f"    {time.strftime('%m-%d %H:%M', time.localtime(minute * 60))} | {target:<20} | "
+              f"样本 {n:>4} | 丢包 {lost / n * 100:5.1f}% (全程 {st.lost / st.sent * 100:.1f}%) | "
+              f"超过 {fmt_ms(thresholds[target])} ms {slow} 个 | 最大 {fmt_ms(peak)} ms")
+
+class Monitor:
+    """
+    多目标并发采样：主循环按固定时钟 (起点 + k × 间隔) 为每个目标提交一次探测，
+    探测在线程池中执行，超时的样本不会推迟下一次采样；落后时跳过错过的时刻而不是补发。
+    """
+    def __init__(self, targets, interval, timeout, ping, on_sample, window):
+        self.states = {t: TargetState(t, window) for t in targets}
+        self.interval = interval
+        self.timeout = timeout
+        self.ping = ping
+        self.on_sample = on_sample
+        self.lock = threading.Lock()
+        self.running = True
+        # 超时大于间隔时同一目标会有多个探测重叠，线程数按重叠上限分配
+        overlap = int(timeout / interval) + 1
+        self.pool = ThreadPoolExecutor(max_workers=max(1, len(targets) * overlap))
+
+    def probe(self, target, tick):
+        try:
+            delay = self.ping(target, timeout=self.timeout)
+            ms = None if delay is None or delay is False else delay * 1000
+        except Exception:
+            ms = None
+        with self.lock:
+            if not self.running:
+                return  # 停止后才返回的样本不再统计
+            self.states[target].record(ms)
+            self.on_sample(target, tick, ms)
+
+    def run(self, on_tick):
+        start = time.monotonic()
+        tick = 0
+        try:
+            while True:
+                for target in self.states:
+                    self.pool.submit(self.probe, target, start + tick * self.interval)
+                tick += 1
+                now = time.monotonic()
+                if now > start + tick * self.interval:
+                    tick = int((now - start) / self.interval) + 1
+                time.sleep(max(0.0, start + tick * self.interval - now))
+                with self.lock:
+                    on_tick()
+        finally:
+            with self.lock:
+                self.running = False
+            self.pool.shutdown(wait=False, cancel_futures=True)
+
+def fmt_ms(value):
+    return "-" if math.isnan(value) else f"{value:.1f}"
+
+def render_table(states, Fore, window):
+    # 中文标题占两列宽，按显示宽度补齐
+    columns = "".join(f"{c:>{6 if not c.isascii() else 8}}" for c in ["最小", "平均", "p50", "p95", "p99", "最大", "抖动"])
+    lines = [f"{Fore.WHITE} {'目标':<18} {'当前':>8}{columns} {'丢包':>5}  最近 {SPARK_WIDTH} 次 (窗口 {window} 个样本, ms)"]
+    for s in states.values():
+        last = f"{s.last:.2f}" if s.last is not None else ("超时" if s.sent else "-")
+        st = s.stats()
+        values = "".join(f"{fmt_ms(st[k]):>8}" for k in ("min", "avg", "p50", "p95", "p99", "max", "jitter"))
+        loss = "-" if math.isnan(st["loss"]) else f"{st['loss']:.1f}%"
+        color = latency_color(Fore, s.last) if s.sent else Fore.WHITE
+        lines.append(f"{color} {s.target:<20} {last:>10}{values} {loss:>7}  {s.sparkline()}")
+    return lines
+
+def print_summary(states, Fore):
+    """退出时输出每个目标的全程分位数与延迟分布直方图"""
+    for s in states.values():
+        h = s.histogram
+        loss = s.lost / s.sent * 100 if s.sent else 0
+        print(f"\n{Fore.CYAN} 🎯 {s.target} | 发送 {s.sent} | 丢包 {s.lost} ({loss:.1f}%)")
+        if not h.total:
+            continue
+        print(f"    最小 {h.min:.2f} | p50 {h.percentile(0.5):.2f} | p90 {h.percentile(0.9):.2f} | "
+              f"p99 {h.percentile(0.99):.2f} | p99.9 {h.percentile(0.999):.2f} | 最大 {h.max:.2f} (ms)")
+        ranges = [(label, n) for label, n in h.ranges(SUMMARY_EDGES) if n]
+        peak = max(n for _, n in ranges)
+        for label, n in ranges:
+            bar = "█" * max(1, round(n / peak * 30))
+            print(f"    {label:>12} | {bar:<30} {n} ({n / h.total * 100:.1f}%)")
 
 def run_netspeed(args, tools):
-    ping = tools["ping"]
     Fore = tools["Fore"]
-    
+
     # 严谨处理参数获取
-    target = getattr(args, 'target', '114.114.114.114')
-    
+    targets = list(dict.fromkeys(getattr(args, 'targets', None) or ['114.114.114.114']))
+    interval = max(0.05, getattr(args, 'interval', 1.0) or 1.0)
+    timeout = getattr(args, 'timeout', 2.0) or 2.0
+    window = max(2, getattr(args, 'window', 300) or 300)
+    record_path = getattr(args, 'record', None)
+    replay_path = getattr(args, 'replay', None)
+
     print(f"{Fore.CYAN}┌────────────────────────────────────────────────────────────┐")
     print(f"│                🚀 DevBox - NetSpeed 网络监控               │")
     print(f"└────────────────────────────────────────────────────────────┘")
-    
-    # 权限检查提示
-    if not is_admin():
-        print(f"{Fore.YELLOW}[警告] 当前未以管理员身份运行。ICMP Ping 可能会失败。")
-        print(f"{Fore.YELLOW}[建议] 请尝试使用 管理员模式(Windows) 或 sudo(Linux) 重新运行。")
+
+    if replay_path:
+        try:
+            replay_recording(replay_path, Fore, window)
+        except (OSError, ValueError) as e:
+            print(f"{Fore.RED}❌ 无法读取记录文件: {e}")
+        except struct.error:
+            print(f"{Fore.RED}❌ 无法读取记录文件: 记录文件已损坏")
+        return
+
+    probes = tools["probe"]
+    try:
+        ping = probes.get_backend(getattr(args, 'probe', 'auto'), getattr(args, 'port', None))
+    except ValueError as e:
+        print(f"{Fore.RED}❌ {e}")
+        return
+
+    # 权限检查提示：无法发送 ICMP 时所有样本都会被计为丢包
+    if ping.name == "icmp" and not probes.icmp_available():
+        print(f"{Fore.YELLOW}[警告] 当前进程无权发送 ICMP，Ping 将全部失败。")
+        print(f"{Fore.YELLOW}[建议] 使用 --probe tcp / --probe udp 以普通用户身份测量，或以 管理员模式(Windows) / sudo(Linux) 运行。")
         print("-" * 62)
 
-    print(f" 🎯 监控目标: {target}")
+    print(f" 🎯 监控目标: {', '.join(targets)}")
+    port_note = f" (默认端口 {ping.port})" if hasattr(ping, "port") else ""
+    print(f" 📡 探测方式: {ping.name}{port_note}")
+    print(f" ⏱  采样间隔: {interval:g}s | 超时: {timeout:g}s")
+    recorder = None
+    if record_path:
+        try:
+            recorder = Recorder(record_path, targets)
+            print(f" 📼 记录到: {record_path} (使用 --replay 回放分析)")
+        except OSError as e:
+            print(f"{Fore.RED}[警告] 无法打开记录文件: {e}")
     print(f" 🛑 停止操作: 按 Ctrl+C")
     print("-" * 62 + "\n")
 
+    # 终端中原地刷新表格；输出被重定向时退回逐条打印，便于记录到文件
+    live = sys.stdout.isatty()
+    drawn = [0]
+
+    def on_sample(target, tick, ms):
+        if recorder:
+            recorder.write(target, time.time(), ms)
+        if live:
+            return
+        stamp = time.strftime('%H:%M:%S', time.localtime(time.time()))
+        if ms is None:
+            print(f"{Fore.RED}● {stamp} | {target} | ❌ 请求超时或目标不可达", flush=True)
+        else:
+            print(f"{latency_color(Fore, ms)}● {stamp} | {target} | 延迟: {ms:.2f} ms", flush=True)
+
+    def on_tick():
+        if recorder:
+            recorder.flush()
+        if not live:
+            return
+        lines = render_table(monitor.states, Fore, window)
+        # 光标回到上次表格的起始行并清除，再重绘
+        if drawn[0]:
+            sys.stdout.write(f"\033[{drawn[0]}F\033[J")
+        sys.stdout.write("\n".join(lines) + "\n")
+        sys.stdout.flush()
+        drawn[0] = len(lines)
+
+    monitor = Monitor(targets, interval, timeout, ping, on_sample, window)
     try:
-        while True:
-            # ping3.ping 返回值是秒(s)，None 表示失败
-            try:
-                delay = ping(target, timeout=2)
-                
-                if delay is None or delay is False:
-                    print(f"{Fore.RED}● {time.strftime('%H:%M:%S')} | ❌ 请求超时或目标不可达")
-                else:
-                    ms = delay * 1000
-                    # 根据延迟设置颜色
-                    if ms < 50:
-                        color = Fore.GREEN
-                    elif ms < 150:
-                        color = Fore.YELLOW
-                    else:
-                        color = Fore.RED
-                        
-                    print(f"{color}● {time.strftime('%H:%M:%S')} | 延迟: {ms:.2f} ms")
-            
-            except Exception as e:
-                print(f"{Fore.RED}● 运行异常: {e}")
-                
-            time.sleep(1)
-            
+        monitor.run(on_tick)
     except KeyboardInterrupt:
-        print(f"\n{Fore.YELLOW}[系统] 监控已停止。")
\ No newline at end of file
+        print(f"\n{Fore.YELLOW}[系统] 监控已停止。")
+        print_summary(monitor.states, Fore)
+    finally:
+        if recorder:
+            with monitor.lock:
+                recorder.close()
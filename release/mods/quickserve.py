@@ -4,111 +4,1080 @@ import socket
 import os
 import sys
 import re
-from urllib.parse import quote
+import html
+import json
+import time
+import zlib
+import tarfile
+import zipfile
+import threading
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict, deque
+from urllib.parse import quote, unquote, urlsplit, parse_qs, urlencode
+
+__info__ = {
+    "help": "局域网双向文件传输 (扫码访问)",
+    "alias": ["qs", "serve"],
+    "deps": ["qrcode"],
+    "daemon": False  # 常驻文件服务，始终在本地执行
+}
+
+def setup_args(parser):
+    parser.add_argument("--port", type=int, default=8000, help="监听端口")
+    parser.add_argument("--max-conn", type=int, default=64, help="同时服务的连接数上限，超出的连接在队列中等待")
+    parser.add_argument("--keepalive", type=float, default=15, help="keep-alive 空闲连接的保持时间 (秒)")
+    parser.add_argument("--limit", type=float, default=0, help="全局带宽上限 (MB/s，上下行合计，0 表示不限)")
+    parser.add_argument("--client-limit", type=float, default=0, help="单个客户端的带宽上限 (MB/s，0 表示不限)")
+    parser.add_argument("--dashboard", action="store_true", help="在终端实时显示连接数、吞吐、延迟与活动传输")
+
+class QuickServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    """
+    每个连接一个线程并发服务，并用信号量限制同时服务的连接数：
+    达到上限时暂停 accept，新连接留在内核队列中排队，而不是被拒绝。
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, handler, max_conn):
+        self.request_queue_size = max(5, max_conn)
+        self.slots = threading.BoundedSemaphore(max_conn)
+        super().__init__(address, handler)
+
+    def process_request(self, request, client_address):
+        self.slots.acquire()
+        try:
+            super().process_request(request, client_address)
+        except Exception:
+            self.slots.release()
+            raise
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            self.slots.release()
+
+# 上传时每次从套接字读取的块大小
+CHUNK_SIZE = 256 * 1024
+# 单个分段头部的长度上限，防止恶意请求让头部无限增长
+MAX_PART_HEADER = 16 * 1024
+BOUNDARY_RE = re.compile(r'boundary=("[^"]+"|[^;\s]+)')
+FILENAME_RE = re.compile(r'filename="([^"]*)"', re.IGNORECASE)
+
+class MultipartParser:
+    """
+    流式 multipart/form-data 解析器：按固定大小的块读取请求体，
+    在缓冲区中查找分隔符，分隔符之前的数据直接写入磁盘，内存占用与文件大小无关。
+    """
+    def __init__(self, rfile, boundary, length):
+        self.rfile = rfile
+        self.remaining = length
+        self.delimiter = b"\r\n--" + boundary
+        # 请求体以 "--boundary" 开头 (前面没有 CRLF)，补上 CRLF 后统一处理
+        self.buf = b"\r\n"
+
+    def _fill(self):
+        """读入下一块数据，请求体已读完时返回 False"""
+        if self.remaining <= 0:
+            return False
+        data = self.rfile.read(min(CHUNK_SIZE, self.remaining))
+        if not data:
+            raise ValueError("连接提前断开")
+        self.remaining -= len(data)
+        self.buf += data
+        return True
+
+    def _read_until(self, marker, limit):
+        """读到 marker 为止，返回 marker 之前的数据 (marker 被丢弃)"""
+        while True:
+            idx = self.buf.find(marker)
+            if idx >= 0:
+                data, self.buf = self.buf[:idx], self.buf[idx + len(marker):]
+                return data
+            if len(self.buf) > limit or not self._fill():
+                raise ValueError("请求格式错误")
+
+    def _stream_body(self, out):
+        """把分段内容写入 out (None 表示丢弃) 直到分隔符，返回写入的字节数"""
+        written = 0
+        keep = len(self.delimiter) - 1  # 缓冲区末尾可能是被截断的分隔符
+        while True:
+            idx = self.buf.find(self.delimiter)
+            if idx >= 0:
+                chunk, self.buf = self.buf[:idx], self.buf[idx + len(self.delimiter):]
+            else:
+                chunk, self.buf = self.buf[:-keep], self.buf[-keep:]
+            if chunk:
+                if out is not None:
+                    out.write(chunk)
+                written += len(chunk)
+            if idx >= 0:
+                return written
+            if not self._fill():
+                raise ValueError("缺少结束边界")
+
+    def save_files(self, dest_dir):
+        """逐个保存表单中的文件，返回 [(文件名, 字节数)]；非文件字段被忽略"""
+        saved = []
+        self._read_until(self.delimiter, MAX_PART_HEADER)
+        while True:
+            while len(self.buf) < 2 and self._fill():
+                pass
+            if self.buf.startswith(b"--"):
+                break  # 结束边界
+            headers = self._read_until(b"\r\n\r\n", MAX_PART_HEADER).decode("utf-8", "replace")
+            match = FILENAME_RE.search(headers)
+            # 兼容从 Windows 浏览器提交的完整路径
+            filename = os.path.basename(match.group(1).replace("\\", "/")) if match else ""
+            if not filename:
+                self._stream_body(None)
+                continue
+            # 先写入临时文件，完整接收后再改名，避免留下半截文件
+            path = os.path.join(dest_dir, filename)
+            tmp_path = path + ".uploading"
+            try:
+                with open(tmp_path, "wb") as f:
+                    size = self._stream_body(f)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try: os.remove(tmp_path)
+                except OSError: pass
+                raise
+            saved.append((filename, size))
+        # 丢弃结束边界之后的剩余数据，保证 keep-alive 连接可继续使用
+        while self._fill():
+            self.buf = b""
+        return saved
+
+# 单个请求最多接受的区间数，超出时按完整文件响应，避免被大量碎片区间拖垮
+MAX_RANGES = 16
+CONTENT_RANGE_RE = re.compile(r"bytes\s+(?:(\d+)-(\d+)|\*)/(\d+|\*)")
+
+def make_etag(st, encoding=None):
+    """强 ETag：inode + 大小 + 纳秒级 mtime，文件内容被替换或修改后必然变化；压缩版本带编码后缀"""
+    suffix = f"-{encoding}" if encoding else ""
+    return f'"{st.st_ino:x}-{st.st_size:x}-{st.st_mtime_ns:x}{suffix}"'
+
+# 小于该大小的文件压缩收益有限，直接原样发送
+MIN_COMPRESS_SIZE = 1024
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml",
+                      "application/x-sh", "image/svg+xml", "application/x-yaml")
+# 打包下载支持的格式：查询参数 -> (扩展名, tarfile 流模式；None 表示 zip)
+ARCHIVE_FORMATS = {"zip": (".zip", None), "tar": (".tar", "w|"), "tar.gz": (".tar.gz", "w|gz"), "tgz": (".tar.gz", "w|gz")}
+
+def is_compressible(ctype):
+    return ctype.startswith(COMPRESSIBLE_TYPES)
+
+class ChunkedWriter:
+    """
+    以 HTTP/1.1 分块传输编码写出长度未知的响应 (实时压缩、打包下载)。
+    chunked=False 时 (HTTP/1.0 客户端) 原样写出，由关闭连接表示响应结束。
+    """
+    def __init__(self, wfile, chunked=True):
+        self.wfile = wfile
+        self.chunked = chunked
+
+    def write(self, data):
+        if data:
+            if self.chunked:
+                self.wfile.write(b"%X\r\n%b\r\n" % (len(data), data))
+            else:
+                self.wfile.write(data)
+        return len(data)
+
+    def flush(self):
+        self.wfile.flush()
+
+    def close(self):
+        if self.chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+def etag_matches(header, etag, weak=False):
+    """If-Match 使用强比较；If-None-Match 使用弱比较 (忽略 W/ 前缀)"""
+    if weak and etag.startswith("W/"):
+        etag = etag[2:]
+    for tag in (t.strip() for t in header.split(",")):
+        if tag == "*":
+            return True
+        if weak and tag.startswith("W/"):
+            tag = tag[2:]
+        if tag == etag:
+            return True
+    return False
+
+def parse_ranges(header, size):
+    """
+    解析 Range 头，返回 [(起, 止)] (闭区间)。
+    格式无法识别时返回 None (按完整文件响应)，所有区间都不可满足时返回 []。
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes":
+        return None
+    ranges = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep or not (first or last) or not (first or "0").isdigit() or not (last or "0").isdigit():
+            return None
+        if not first:  # 后缀区间：最后 N 个字节
+            if int(last) == 0:
+                continue
+            start, end = max(0, size - int(last)), size - 1
+        else:
+            start, end = int(first), min(int(last), size - 1) if last else size - 1
+            if start > int(last or start):
+                return None
+        if start < size:
+            ranges.append((start, end))
+    return ranges if len(ranges) <= MAX_RANGES else None
+
+# 目录页每页条目数 (默认/上限)、排序方式与缓存的目录数
+PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+SORT_KEYS = {"name": "名称", "size": "大小", "mtime": "修改时间"}
+INDEX_CACHE_SIZE = 64
+
+INDEX_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1">
+    <title>DevBox QuickServe</title>
+    <style>
+        body { font-family: sans-serif; background: #f0f2f5; padding: 20px; }
+        .container { max-width: 640px; margin: auto; background: white; padding: 25px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); }
+        .upload-area { border: 2px dashed #ccd0d5; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center; }
+        input[type="submit"] { background: #1877f2; color: white; border: none; padding: 10px 20px; border-radius: 6px; cursor: pointer; }
+        ul { word-wrap: break-word; }
+        small, .bar { color: #65676b; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h2>🚀 QuickServe 双向传输</h2>
+        <div class="upload-area">
+            <form enctype="multipart/form-data" method="post">
+                <input name="file" type="file" multiple required />
+                <br><br>
+                <input type="submit" value="上传到当前目录" />
+            </form>
+        </div>
+        <h3>📂 __CRUMBS__</h3>
+        <div class="bar">排序: __SORTERS__ · <a href="__JSON_LINK__">JSON</a></div>
+        <ul>__FILES_LIST__</ul>
+        <div class="bar">__PAGER__</div>
+    </div>
+</body>
+</html>
+"""
+
+def format_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+class DirIndex:
+    """
+    目录列表缓存 (LRU)：条目与各排序视图按目录 mtime 失效，
+    文件增删、改名 (包括上传完成时的改名) 都会更新目录 mtime。
+    仅原地改写文件内容时显示的大小/时间可能滞后，直到目录下次变化。
+    """
+    def __init__(self, limit=INDEX_CACHE_SIZE):
+        self.limit = limit
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def scan(path):
+        entries = []
+        with os.scandir(path) as it:
+            for entry in it:
+                if entry.name.endswith(".uploading"):
+                    continue  # 未传完的上传文件
+                try:
+                    is_dir = entry.is_dir()
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((entry.name, is_dir, 0 if is_dir else st.st_size, st.st_mtime))
+        return entries
+
+    def get(self, path, sort, reverse):
+        """返回 (目录 mtime_ns, 排好序的条目列表)，目录始终排在文件前面"""
+        mtime = os.stat(path).st_mtime_ns
+        with self.lock:
+            cached = self.items.get(path)
+            if cached and cached["mtime"] == mtime:
+                self.items.move_to_end(path)
+            else:
+                cached = None
+        if cached is None:
+            cached = {"mtime": mtime, "entries": self.scan(path), "views": {}}
+            with self.lock:
+                self.items[path] = cached
+                self.items.move_to_end(path)
+                while len(self.items) > self.limit:
+                    self.items.popitem(last=False)
+
+        view = cached["views"].get((sort, reverse))
+        if view is None:
+            if sort == "size":
+                key = lambda e: e[2]
+            elif sort == "mtime":
+                key = lambda e: e[3]
+            else:
+                key = lambda e: e[0].lower()
+            ordered = sorted(cached["entries"], key=key, reverse=reverse)
+            view = [e for e in ordered if e[1]] + [e for e in ordered if not e[1]]
+            cached["views"][(sort, reverse)] = view
+        return mtime, view
+
+DIR_INDEX = DirIndex()
+
+# 首字节延迟样本数 (用于分位数)、限速时每次发送/计费的最大块
+LATENCY_SAMPLES = 2048
+SHAPE_CHUNK = 64 * 1024
+# 不限速时 sendfile 每次发送的块大小，分块是为了让仪表盘能看到传输进度
+SENDFILE_CHUNK = 4 * 1024 * 1024
+
+class TokenBucket:
+    """令牌桶限速 (字节/秒)：令牌不足时预支并睡眠相应时长，多个线程按到达顺序排队"""
+    def __init__(self, rate):
+        self.rate = rate
+        self.capacity = max(rate / 4, SHAPE_CHUNK)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self, n):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            self.tokens -= n
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+def percentile(values, q):
+    """values 需已排序"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+class Metrics:
+    """
+    全局传输统计 (线程安全)：活动连接、请求数、上下行字节、进行中的传输、
+    响应状态码与首字节延迟样本；同时持有全局/单客户端限速桶。
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.connections = 0
+        self.requests = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.statuses = {}
+        self.transfers = {}
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.events = deque(maxlen=6)
+        self.quiet = False  # 仪表盘模式下事件只显示在面板里
+        self.global_bucket = None
+        self.client_rate = 0
+        self.client_buckets = {}
+        self._next_id = 0
+
+    def configure(self, limit, client_limit):
+        self.global_bucket = TokenBucket(limit) if limit else None
+        self.client_rate = client_limit
+
+    @property
+    def shaping(self):
+        return self.global_bucket is not None or bool(self.client_rate)
+
+    def shape(self, client, n):
+        if self.client_rate:
+            with self.lock:
+                bucket = self.client_buckets.get(client)
+                if bucket is None:
+                    bucket = self.client_buckets[client] = TokenBucket(self.client_rate)
+            bucket.consume(n)
+        if self.global_bucket:
+            self.global_bucket.consume(n)
+
+    def connection(self, delta):
+        with self.lock:
+            self.connections += delta
+
+    def begin(self, client, method, path):
+        with self.lock:
+            self._next_id += 1
+            self.requests += 1
+            transfer = {"id": self._next_id, "client": client, "method": method, "path": path,
+                        "bytes": 0, "started": time.perf_counter(), "status": None, "ttfb": None}
+            self.transfers[transfer["id"]] = transfer
+            return transfer
+
+    def count(self, transfer, n, direction):
+        with self.lock:
+            if direction == "in":
+                self.bytes_in += n
+            else:
+                self.bytes_out += n
+            if transfer is not None:
+                transfer["bytes"] += n
+
+    def first_byte(self, transfer):
+        if transfer["ttfb"] is None:
+            transfer["ttfb"] = time.perf_counter() - transfer["started"]
+            with self.lock:
+                self.latencies.append(transfer["ttfb"])
+
+    def end(self, transfer):
+        with self.lock:
+            self.transfers.pop(transfer["id"], None)
+            code = str(transfer["status"] or 0)
+            self.statuses[code] = self.statuses.get(code, 0) + 1
+
+    def event(self, message):
+        self.events.append(f"{time.strftime('%H:%M:%S')} {message}")
+        if not self.quiet:
+            print(message)
+
+    def snapshot(self):
+        now = time.perf_counter()
+        with self.lock:
+            latencies = sorted(self.latencies)
+            transfers = [{"client": t["client"], "method": t["method"], "path": t["path"], "bytes": t["bytes"],
+                          "seconds": round(now - t["started"], 3),
+                          "rate": round(t["bytes"] / max(now - t["started"], 1e-6), 1)}
+                         for t in self.transfers.values()]
+            return {
+                "uptime": round(time.time() - self.started, 1),
+                "connections": self.connections,
+                "requests": self.requests,
+                "bytes_in": self.bytes_in,
+                "bytes_out": self.bytes_out,
+                "statuses": dict(self.statuses),
+                "ttfb_ms": {q: round(percentile(latencies, float(q)) * 1000, 3) for q in ("0.5", "0.95", "0.99")},
+                "transfers": sorted(transfers, key=lambda t: -t["rate"]),
+                "limits": {"global": self.global_bucket.rate if self.global_bucket else 0, "client": self.client_rate},
+            }
+
+    def prometheus(self):
+        """Prometheus 文本格式，便于直接被抓取"""
+        snap = self.snapshot()
+        lines = [
+            f"quickserve_uptime_seconds {snap['uptime']}",
+            f"quickserve_connections_active {snap['connections']}",
+            f"quickserve_requests_total {snap['requests']}",
+            f"quickserve_transfers_active {len(snap['transfers'])}",
+            f'quickserve_bytes_total{{direction="in"}} {snap["bytes_in"]}',
+            f'quickserve_bytes_total{{direction="out"}} {snap["bytes_out"]}',
+        ]
+        lines += [f'quickserve_responses_total{{code="{code}"}} {n}' for code, n in sorted(snap["statuses"].items())]
+        lines += [f'quickserve_ttfb_seconds{{quantile="{q}"}} {round(ms / 1000, 6)}' for q, ms in snap["ttfb_ms"].items()]
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+class MeteredReader:
+    """包装 rfile：统计入站字节，并按限速桶节流上传"""
+    def __init__(self, raw, handler):
+        self.raw = raw
+        self.handler = handler
+
+    def read(self, n=-1):
+        data = self.raw.read(n)
+        self.handler.account(len(data), "in")
+        return data
+
+    def readline(self, limit=-1):
+        data = self.raw.readline(limit)
+        self.handler.account(len(data), "in")
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
+
+class MeteredWriter:
+    """包装 wfile：统计出站字节，限速时拆成小块逐块节流发送"""
+    def __init__(self, raw, handler):
+        self.raw = raw
+        self.handler = handler
+
+    def write(self, data):
+        view = memoryview(data)
+        step = SHAPE_CHUNK if METRICS.shaping else len(view) or 1
+        for i in range(0, len(view), step):
+            piece = view[i:i + step]
+            self.handler.account(len(piece), "out")
+            self.raw.write(piece)
+        return len(view)
+
+    def __getattr__(self, name):
+        return getattr(self.raw, name)
 
 class UploadHandler(http.server.SimpleHTTPRequestHandler):
-    def do_GET(self):
-        if self.path == '/':
-            self.send_response(200)
-            self.send_header("Content-type", "text/html; charset=utf-8")
-            self.end_headers()
-            
-            # 修复点 1: 使用 quote 处理文件名，防止空格导致网址断开
-            items = []
-            for f in os.listdir('.'):
-                if os.path.isfile(f):
-                    safe_name = quote(f)
-                    items.append(f'<li><a href="{safe_name}">{f}</a></li>')
-            files_list_html = "".join(items)
-
-            # 修复点 2: 严格处理 f-string 中的大括号冲突
-            html_template = """
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="utf-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1">
-                <title>DevBox QuickServe</title>
-                <style>
-                    body { font-family: sans-serif; background: #f0f2f5; padding: 20px; }
-                    .container { max-width: 500px; margin: auto; background: white; padding: 25px; border-radius: 12px; box-shadow: 0 4px 12px rgba(0,0,0,0.1); }
-                    .upload-area { border: 2px dashed #ccd0d5; padding: 20px; border-radius: 8px; margin: 20px 0; text-align: center; }
-                    input[type="submit"] { background: #1877f2; color: white; border: none; padding: 10px 20px; border-radius: 6px; cursor: pointer; }
-                    ul { word-wrap: break-word; }
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <h2>🚀 QuickServe 双向传输</h2>
-                    <div class="upload-area">
-                        <form enctype="multipart/form-data" method="post">
-                            <input name="file" type="file" required />
-                            <br><br>
-                            <input type="submit" value="上传到电脑" />
-                        </form>
-                    </div>
-                    <h3>📂 目录文件列表</h3>
-                    <ul>__FILES_LIST__</ul>
-                </div>
-            </body>
-            </html>
-            """
-            # 使用 replace 替代 f-string 注入，彻底避免大括号解析错误
-            final_html = html_template.replace("__FILES_LIST__", files_list_html)
-            self.wfile.write(final_html.encode('utf-8'))
+    # HTTP/1.1 默认保持连接，同一客户端连续下载/刷新页面时复用 TCP 连接
+    protocol_version = "HTTP/1.1"
+    # 空闲连接超时 (秒)，由 run_quickserve 按 --keepalive 设置
+    timeout = 15
+
+    # 当前请求的区间发送计划 [(分段头, 起始偏移, 长度)] 与结尾边界，由 send_head 设置
+    range_plan = None
+    range_trailer = b""
+    # 当前请求协商出的实时压缩编码 (gzip/deflate)，None 表示原样发送
+    content_encoding = None
+    # 当前请求在 METRICS 中的传输记录
+    transfer = None
+
+    def setup(self):
+        super().setup()
+        self.rfile = MeteredReader(self.rfile, self)
+        self.wfile = MeteredWriter(self.wfile, self)
+        METRICS.connection(1)
+
+    def finish(self):
+        try:
+            super().finish()
+        finally:
+            METRICS.connection(-1)
+
+    def handle_one_request(self):
+        self.transfer = None
+        try:
+            super().handle_one_request()
+        finally:
+            if self.transfer is not None:
+                METRICS.end(self.transfer)
+
+    def parse_request(self):
+        ok = super().parse_request()
+        if ok:
+            self.transfer = METRICS.begin(self.client_address[0], self.command, self.path)
+        return ok
+
+    def send_response(self, code, message=None):
+        if self.transfer is not None:
+            self.transfer["status"] = code
+        super().send_response(code, message)
+
+    def end_headers(self):
+        super().end_headers()
+        if self.transfer is not None:
+            METRICS.first_byte(self.transfer)
+
+    def account(self, n, direction):
+        """记录传输字节；开启限速时按全局与该客户端的令牌桶节流"""
+        if n:
+            METRICS.count(self.transfer, n, direction)
+            if METRICS.shaping:
+                METRICS.shape(self.client_address[0], n)
+
+    def send_file_range(self, source, offset, count):
+        """分块 sendfile：逐块计费/限速，仪表盘也能看到大文件的实时进度"""
+        step = SHAPE_CHUNK if METRICS.shaping else SENDFILE_CHUNK
+        end = offset + count if count is not None else os.fstat(source.fileno()).st_size
+        while offset < end:
+            n = min(step, end - offset)
+            self.account(n, "out")
+            sent = self.connection.sendfile(source, offset, n)
+            if not sent:
+                break
+            offset += sent
+
+    def copyfile(self, source, outputfile):
+        """
+        文件下载走 socket.sendfile：支持的系统上由内核直接从文件拷贝到套接字 (os.sendfile)，
+        不经过用户态缓冲；不支持时自动回退为普通 send。Range 请求只发送对应区间。
+        """
+        if not hasattr(source, "fileno"):
+            return super().copyfile(source, outputfile)
+        if self.content_encoding:
+            return self.copy_compressed(source, outputfile)
+        outputfile.flush()
+        if not self.range_plan:
+            self.send_file_range(source, 0, None)
+            return
+        for prefix, offset, count in self.range_plan:
+            if prefix:
+                outputfile.write(prefix)
+            self.send_file_range(source, offset, count)
+        if self.range_trailer:
+            outputfile.write(self.range_trailer)
+
+    def copy_compressed(self, source, outputfile):
+        """边读边压缩，按块发送，不生成临时文件"""
+        # HTTP 中的 deflate 指 zlib 格式 (wbits=15)，gzip 为 wbits=31
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31 if self.content_encoding == "gzip" else 15)
+        out = ChunkedWriter(outputfile)
+        while True:
+            data = source.read(CHUNK_SIZE)
+            if not data:
+                break
+            out.write(compressor.compress(data))
+        out.write(compressor.flush())
+        out.close()
+
+    def negotiate_encoding(self, ctype, size):
+        """按 Accept-Encoding 选择 gzip/deflate；只压缩文本类文件，且需要 HTTP/1.1 分块传输"""
+        if self.request_version != "HTTP/1.1" or size < MIN_COMPRESS_SIZE or not is_compressible(ctype):
+            return None
+        accepted = {}
+        for item in self.headers.get("Accept-Encoding", "").split(","):
+            name, _, params = item.strip().partition(";")
+            q = 1.0
+            if params.strip().startswith("q="):
+                try: q = float(params.strip()[2:])
+                except ValueError: q = 0.0
+            accepted[name.strip().lower()] = q
+        for encoding in ("gzip", "deflate"):
+            if accepted.get(encoding, 0) > 0:
+                return encoding
+        return None
+
+    def send_archive(self, path, fmt):
+        """把目录实时打包为 zip/tar/tar.gz 并以分块传输发送，不写临时文件"""
+        ext, tar_mode = ARCHIVE_FORMATS[fmt]
+        name = os.path.basename(os.path.normpath(path)) or "files"
+        chunked = self.request_version == "HTTP/1.1"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/zip" if tar_mode is None else "application/x-tar")
+        self.send_header("Content-Disposition", f"attachment; filename*=UTF-8''{quote(name + ext)}")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
         else:
-            return super().do_GET()
+            self.close_connection = True
+        self.end_headers()
 
-    def do_POST(self):
+        out = ChunkedWriter(self.wfile, chunked)
+        if tar_mode is None:
+            archive = zipfile.ZipFile(out, "w", allowZip64=True)
+        else:
+            archive = tarfile.open(fileobj=out, mode=tar_mode)
+        with archive:
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                for fname in sorted(files):
+                    if fname.endswith(".uploading"):
+                        continue  # 未传完的上传文件
+                    full = os.path.join(root, fname)
+                    arcname = os.path.join(name, os.path.relpath(full, path))
+                    try:
+                        if tar_mode is None:
+                            # 文本类文件压缩，其余 (图片、镜像、压缩包) 直接存储，避免无谓的 CPU 开销
+                            compress = zipfile.ZIP_DEFLATED if is_compressible(self.guess_type(fname)) else zipfile.ZIP_STORED
+                            archive.write(full, arcname, compress_type=compress)
+                        else:
+                            archive.add(full, arcname, recursive=False)
+                    except OSError:
+                        pass  # 打包过程中被删除或无权限读取的文件
+        out.close()
+
+    def is_not_modified(self, st, etag):
+        """If-None-Match 优先；没有时才比较 If-Modified-Since"""
+        if_none_match = self.headers.get("If-None-Match")
+        if if_none_match:
+            return etag_matches(if_none_match, etag, weak=True)
+        since = self.headers.get("If-Modified-Since")
+        if since:
+            try:
+                return int(st.st_mtime) <= parsedate_to_datetime(since).timestamp()
+            except (TypeError, ValueError, IndexError, OverflowError):
+                pass
+        return False
+
+    def if_range_ok(self, st, etag):
+        """If-Range 与当前文件一致 (或未携带) 时才按区间响应，否则返回完整的新文件"""
+        value = self.headers.get("If-Range")
+        if not value:
+            return True
+        if value.strip().startswith('"'):
+            return value.strip() == etag
+        try:
+            return int(st.st_mtime) == int(parsedate_to_datetime(value).timestamp())
+        except (TypeError, ValueError, IndexError, OverflowError):
+            return False
+
+    def send_head(self):
+        """
+        普通文件的响应头：强 ETag、条件请求 (If-Match / If-None-Match / If-Modified-Since / If-Range)
+        与单区间、多区间 (multipart/byteranges) 的 Range 请求；目录等其他情况交给父类处理。
+        """
+        self.range_plan, self.range_trailer, self.content_encoding = None, b"", None
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            return super().send_head()
         try:
-            content_type = self.headers.get('Content-Type')
-            if not content_type or 'multipart/form-data' not in content_type:
-                self.send_error(400, "非法提交")
+            f = open(path, 'rb')
+        except OSError:
+            self.send_error(404, "File not found")
+            return None
+        try:
+            st = os.fstat(f.fileno())
+            ctype = self.guess_type(path)
+            # Range 请求按原始字节发送，不压缩
+            encoding = None if self.headers.get("Range") else self.negotiate_encoding(ctype, st.st_size)
+            size, etag = st.st_size, make_etag(st, encoding)
+            if_match = self.headers.get("If-Match")
+            if if_match and not etag_matches(if_match, etag):
+                self.send_error(412, explain="文件已变化")
+                f.close()
+                return None
+            if self.is_not_modified(st, etag):
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                f.close()
+                return None
+
+            ranges = None
+            if self.headers.get("Range") and self.if_range_ok(st, etag):
+                ranges = parse_ranges(self.headers["Range"], size)
+                if ranges == []:
+                    self.send_response(416)
+                    self.send_header("Content-Range", f"bytes */{size}")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    f.close()
+                    return None
+
+            if not ranges:
+                self.send_response(200)
+                self.send_header("Content-Type", ctype)
+                length = size
+                if encoding:
+                    # 压缩后长度未知，改用分块传输
+                    self.content_encoding = encoding
+                    self.send_header("Content-Encoding", encoding)
+                    self.send_header("Transfer-Encoding", "chunked")
+                    length = None
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.send_response(206)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+                self.range_plan = [(b"", start, end - start + 1)]
+                length = end - start + 1
+            else:
+                boundary = "qs-" + etag.strip('"')
+                self.range_plan = [(f"\r\n--{boundary}\r\nContent-Type: {ctype}\r\n"
+                                    f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n".encode(),
+                                    start, end - start + 1) for start, end in ranges]
+                self.range_trailer = f"\r\n--{boundary}--\r\n".encode()
+                self.send_response(206)
+                self.send_header("Content-Type", f"multipart/byteranges; boundary={boundary}")
+                length = sum(len(p) + n for p, _, n in self.range_plan) + len(self.range_trailer)
+            if length is not None:
+                self.send_header("Content-Length", str(length))
+            if is_compressible(ctype):
+                self.send_header("Vary", "Accept-Encoding")
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("ETag", etag)
+            self.send_header("Last-Modified", self.date_time_string(st.st_mtime))
+            self.end_headers()
+            return f
+        except Exception:
+            f.close()
+            raise
+
+    def iter_body(self):
+        """按块产出请求体，支持 Content-Length 与 Transfer-Encoding: chunked"""
+        if "chunked" in self.headers.get("Transfer-Encoding", "").lower():
+            while True:
+                size = int(self.rfile.readline(1024).split(b";")[0].strip() or b"-", 16)
+                if size == 0:
+                    while self.rfile.readline(1024) not in (b"\r\n", b"\n", b""):
+                        pass  # 丢弃 trailer
+                    return
+                while size > 0:
+                    data = self.rfile.read(min(CHUNK_SIZE, size))
+                    if not data:
+                        raise ValueError("连接提前断开")
+                    size -= len(data)
+                    yield data
+                self.rfile.readline(1024)
+        else:
+            remaining = int(self.headers.get("Content-Length", 0))
+            while remaining > 0:
+                data = self.rfile.read(min(CHUNK_SIZE, remaining))
+                if not data:
+                    raise ValueError("连接提前断开")
+                remaining -= len(data)
+                yield data
+
+    def send_upload_status(self, code, received, message=None):
+        """308 表示尚未传完，Range 头告知服务端已持有的字节 (与常见的可续传上传协议一致)"""
+        self.send_response(code, message)
+        if received:
+            self.send_header("Range", f"bytes=0-{received - 1}")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_PUT(self):
+        """
+        PUT 上传，支持断点续传：
+        - 不带 Content-Range 时整体上传；
+        - Content-Range: bytes 起-止/总长 追加一段，起始位置须等于已接收的字节数；
+          总长未知时可写 bytes 起-止/*，此时每段都返回 308，直到某段带上总长并恰好传完；
+        - Content-Range: bytes */总长 (空请求体) 查询已接收的字节数。
+        未传完的数据保存在 <文件名>.uploading，连接中断后已写入的部分保留，传完后改名。
+        """
+        chunked = "chunked" in self.headers.get("Transfer-Encoding", "").lower()
+        if not chunked and not self.headers.get("Content-Length", "").isdigit():
+            self.send_error(411, explain="缺少 Content-Length")
+            return
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) or not os.path.isdir(os.path.dirname(path)):
+            self.close_connection = True
+            self.send_error(409, explain="目标路径不可写入")
+            return
+        partial = path + ".uploading"
+        received = os.path.getsize(partial) if os.path.isfile(partial) else 0
+
+        start, end, total = 0, None, None
+        content_range = self.headers.get("Content-Range")
+        if content_range:
+            match = CONTENT_RANGE_RE.fullmatch(content_range.strip())
+            if not match:
+                self.close_connection = True
+                self.send_error(400, explain="无法识别的 Content-Range")
+                return
+            if match.group(1) is None:
+                self.send_upload_status(308, received, "Resume Incomplete")
+                return
+            start, end = int(match.group(1)), int(match.group(2))
+            total = int(match.group(3)) if match.group(3) != "*" else None
+            if start not in (0, received):
+                # 请求体未读取，无法复用连接
+                self.close_connection = True
+                self.send_upload_status(409, received)
                 return
 
-            boundary = content_type.split("boundary=")[1].encode()
-            remainbytes = int(self.headers.get('Content-Length'))
-            
-            line = self.rfile.readline()
-            remainbytes -= len(line)
-            if boundary not in line:
-                self.send_error(400, "解析错误")
+        started = time.perf_counter()
+        written = 0
+        try:
+            with open(partial, "r+b" if start else "wb") as f:
+                f.seek(start)
+                for data in self.iter_body():
+                    f.write(data)
+                    written += len(data)
+        except (OSError, ValueError) as e:
+            self.close_connection = True
+            self.send_error(400 if isinstance(e, ValueError) else 500, explain=f"上传中断: {e}")
+            return
+        received = start + written
+        if (end is not None and received != end + 1) or (total is not None and received > total):
+            self.send_upload_status(400, received, "Length Mismatch")
+            return
+
+        name = os.path.basename(path)
+        elapsed = max(time.perf_counter() - started, 1e-6)
+        if content_range and (total is None or received < total):
+            # 总长未知 (流式上传) 或尚未传完：保留 .uploading，等待后续分段
+            size = f"{total / 1048576:.1f}" if total is not None else "?"
+            METRICS.event(f" ⏸  续传中 {name} | 已接收 {received / 1048576:.1f}/{size} MB | "
+                  f"{written / 1048576 / elapsed:.1f} MB/s")
+            self.send_upload_status(308, received, "Resume Incomplete")
+            return
+        os.replace(partial, path)
+        METRICS.event(f" 📥 PUT 完成 {name} | {received / 1048576:.1f} MB | {written / 1048576 / elapsed:.1f} MB/s"
+              f" | 来自 {self.client_address[0]}")
+        self.send_upload_status(201, 0)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        params = parse_qs(parts.query)
+        if parts.path == "/metrics":
+            return self.send_metrics(params)
+        path = self.translate_path(self.path)
+
+        # ?archive=zip|tar|tar.gz：把目录打包下载
+        fmt = params.get("archive", [None])[0]
+        if fmt:
+            if fmt not in ARCHIVE_FORMATS or not os.path.isdir(path):
+                self.send_error(400, explain="不支持的打包格式或目标不是目录")
                 return
+            return self.send_archive(path, fmt)
 
-            line = self.rfile.readline()
-            remainbytes -= len(line)
-            fn_match = re.findall(r'Content-Disposition.*name="file"; filename="(.*)"', line.decode())
-            if not fn_match:
-                self.send_error(400, "无法识别文件名")
+        if os.path.isdir(path):
+            if not parts.path.endswith('/'):
+                # 目录统一以 / 结尾，页面中的相对链接才能正确解析
+                self.send_response(301)
+                self.send_header("Location", parts.path + "/" + (f"?{parts.query}" if parts.query else ""))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
                 return
-            
-            filename = os.path.basename(fn_match[0])
-            line = self.rfile.readline()
-            remainbytes -= len(line)
-            line = self.rfile.readline()
-            remainbytes -= len(line)
-
-            with open(filename, 'wb') as f:
-                preline = self.rfile.readline()
-                remainbytes -= len(preline)
-                while remainbytes > 0:
-                    line = self.rfile.readline()
-                    remainbytes -= len(line)
-                    if boundary in line:
-                        preline = preline[0:-1]
-                        if preline.endswith(b'\r'):
-                            preline = preline[0:-1]
-                        f.write(preline)
-                        break
-                    else:
-                        f.write(preline)
-                        preline = line
-
-            self.send_response(303)
-            self.send_header('Location', '/')
+            return self.send_index(path, parts.path, params)
+        return super().do_GET()
+
+    def send_metrics(self, params):
+        """/metrics：默认 Prometheus 文本格式，?format=json 返回含活动传输明细的 JSON"""
+        if params.get("format", [""])[0] == "json":
+            body = json.dumps(METRICS.snapshot(), ensure_ascii=False).encode("utf-8")
+            ctype = "application/json; charset=utf-8"
+        else:
+            body = METRICS.prometheus().encode("utf-8")
+            ctype = "text/plain; version=0.0.4; charset=utf-8"
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_HEAD(self):
+        parts = urlsplit(self.path)
+        path = self.translate_path(self.path)
+        if os.path.isdir(path) and parts.path.endswith('/'):
+            return self.send_index(path, parts.path, parse_qs(parts.query), head=True)
+        return super().do_HEAD()
+
+    def send_index(self, path, url_path, params, head=False):
+        """
+        目录页：?sort=name|size|mtime&order=asc|desc&page=N&per=M 排序分页，
+        ?format=json 返回 JSON 列表供脚本使用。列表来自 DIR_INDEX 缓存，目录未变化时不重新扫描。
+        """
+        def param(name, default):
+            return params.get(name, [default])[0]
+
+        sort = param("sort", "name")
+        if sort not in SORT_KEYS:
+            sort = "name"
+        order = "desc" if param("order", "asc") == "desc" else "asc"
+        try:
+            per = min(MAX_PAGE_SIZE, max(1, int(param("per", PAGE_SIZE))))
+            page = max(1, int(param("page", 1)))
+        except ValueError:
+            per, page = PAGE_SIZE, 1
+        as_json = param("format", "html") == "json"
+
+        try:
+            mtime, entries = DIR_INDEX.get(path, sort, order == "desc")
+        except OSError:
+            self.send_error(404, explain="目录不存在或无权限读取")
+            return
+        total = len(entries)
+        pages = max(1, -(-total // per))
+        page = min(page, pages)
+        rows = entries[(page - 1) * per:page * per]
+
+        # 弱 ETag：目录内容 + 视图参数不变时，浏览器刷新直接得到 304
+        etag = f'W/"idx-{mtime:x}-{sort}-{order}-{page}-{per}-{int(as_json)}"'
+        if etag_matches(self.headers.get("If-None-Match", ""), etag, weak=True):
+            self.send_response(304)
+            self.send_header("ETag", etag)
             self.end_headers()
+            return
+
+        if as_json:
+            body = json.dumps({
+                "path": url_path, "total": total, "page": page, "pages": pages, "per_page": per,
+                "sort": sort, "order": order,
+                "entries": [{"name": name, "type": "dir" if is_dir else "file", "size": size, "mtime": mt}
+                            for name, is_dir, size, mt in rows],
+            }, ensure_ascii=False).encode("utf-8")
+            ctype = "application/json; charset=utf-8"
+        else:
+            body = self.render_index(url_path, rows, total, page, pages, per, sort, order).encode("utf-8")
+            ctype = "text/html; charset=utf-8"
+
+        # keep-alive 连接需要明确的 Content-Length，客户端才能知道响应何时结束
+        self.send_response(200)
+        self.send_header("Content-type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def render_index(self, url_path, rows, total, page, pages, per, sort, order):
+        def link(**changes):
+            query = {"sort": sort, "order": order, "page": page, "per": per, **changes}
+            return "?" + urlencode(query)
+
+        # 修复点 1: 使用 quote 处理文件名，防止空格导致网址断开；显示时转义，防止文件名注入 HTML
+        items = []
+        if url_path != "/":
+            items.append('<li>⬆️ <a href="../">上级目录</a></li>')
+        for name, is_dir, size, mt in rows:
+            safe_name, label = quote(name), html.escape(name)
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(mt))
+            if is_dir:
+                items.append(f'<li>📁 <a href="{safe_name}/">{label}/</a> '
+                             f'<a href="{safe_name}/?archive=zip">[zip]</a> '
+                             f'<a href="{safe_name}/?archive=tar.gz">[tar.gz]</a> <small>{stamp}</small></li>')
+            else:
+                items.append(f'<li><a href="{safe_name}">{label}</a> <small>{format_size(size)} · {stamp}</small></li>')
+
+        crumbs = ['<a href="/">根目录</a>']
+        prefix = "/"
+        for seg in filter(None, url_path.split("/")):
+            prefix += seg + "/"
+            crumbs.append(f'<a href="{html.escape(prefix)}">{html.escape(unquote(seg))}</a>')
+
+        sorters = []
+        for key, label in SORT_KEYS.items():
+            next_order = "desc" if key == sort and order == "asc" else "asc"
+            arrow = (" ↑" if order == "asc" else " ↓") if key == sort else ""
+            sorters.append(f'<a href="{link(sort=key, order=next_order, page=1)}">{label}{arrow}</a>')
+        pager = f"第 {page}/{pages} 页 · 共 {total} 项"
+        if page > 1:
+            pager = f'<a href="{link(page=page - 1)}">上一页</a> · ' + pager
+        if page < pages:
+            pager += f' · <a href="{link(page=page + 1)}">下一页</a>'
+
+        # 修复点 2: 使用 replace 替代 f-string 注入，彻底避免大括号解析错误
+        return (INDEX_TEMPLATE.replace("__CRUMBS__", " / ".join(crumbs))
+                .replace("__SORTERS__", " · ".join(sorters))
+                .replace("__PAGER__", pager)
+                .replace("__JSON_LINK__", link(format="json"))
+                .replace("__FILES_LIST__", "".join(items)))
+
+    def do_POST(self):
+        content_type = self.headers.get('Content-Type', '')
+        match = BOUNDARY_RE.search(content_type)
+        if 'multipart/form-data' not in content_type or not match:
+            self.send_error(400, explain="非法提交")
+            return
+        length = self.headers.get('Content-Length')
+        if not length or not length.isdigit():
+            self.send_error(411, explain="缺少 Content-Length")
+            return
+
+        # 上传到当前浏览的目录
+        parts = urlsplit(self.path)
+        dest_dir = self.translate_path(parts.path)
+        if not os.path.isdir(dest_dir):
+            dest_dir = '.'
+
+        start = time.perf_counter()
+        parser = MultipartParser(self.rfile, match.group(1).strip('"').encode(), int(length))
+        try:
+            saved = parser.save_files(dest_dir)
         except Exception as e:
-            self.send_error(500, f"Server Error: {e}")
+            # 请求体未读完，连接无法继续复用
+            self.close_connection = True
+            self.send_error(400 if isinstance(e, ValueError) else 500, explain=f"上传失败: {e}")
+            return
+        if not saved:
+            self.send_error(400, explain="无法识别文件名")
+            return
+
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        total = sum(size for _, size in saved)
+        names = ", ".join(name for name, _ in saved)
+        METRICS.event(f" 📥 收到 {len(saved)} 个文件 ({names}) | {total / 1048576:.1f} MB | "
+              f"{total / 1048576 / elapsed:.1f} MB/s | 来自 {self.client_address[0]}")
+
+        self.send_response(303)
+        self.send_header('Location', parts.path or '/')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
 
     def log_message(self, format, *args):
         pass
@@ -138,9 +1107,52 @@ def get_real_ip():
         except:
             return '127.0.0.1'
 
+def format_rate(rate):
+    return f"{format_size(rate)}/s"
+
+def dashboard_loop(Fore, interval=1.0):
+    """
+    终端实时面板：在二维码下方保存光标位置，每次刷新回到该位置重绘，
+    显示连接、吞吐、首字节延迟分位数、活动传输与最近事件。
+    """
+    sys.stdout.write("\0337")  # 保存光标位置
+    last = METRICS.snapshot()
+    while True:
+        time.sleep(interval)
+        snap = METRICS.snapshot()
+        rate_in = (snap["bytes_in"] - last["bytes_in"]) / interval
+        rate_out = (snap["bytes_out"] - last["bytes_out"]) / interval
+        last = snap
+        ttfb = snap["ttfb_ms"]
+        limits = snap["limits"]
+        lines = [
+            f"{Fore.CYAN} 📊 运行 {snap['uptime']:.0f}s | 连接 {snap['connections']} | 请求 {snap['requests']} | "
+            f"传输中 {len(snap['transfers'])}",
+            f" ⬇ 下载 {format_rate(rate_out):>12} (累计 {format_size(snap['bytes_out'])}) | "
+            f"⬆ 上传 {format_rate(rate_in):>12} (累计 {format_size(snap['bytes_in'])})",
+            f" ⌛ 首字节延迟 p50 {ttfb['0.5']:.1f} ms | p95 {ttfb['0.95']:.1f} ms | p99 {ttfb['0.99']:.1f} ms",
+            f" 🚦 限速: 全局 {format_rate(limits['global']) if limits['global'] else '不限'} | "
+            f"单客户端 {format_rate(limits['client']) if limits['client'] else '不限'}",
+            f"{Fore.WHITE} 活动传输:",
+        ]
+        for t in snap["transfers"][:8]:
+            lines.append(f"   {t['client']:<15} {t['method']:<4} {t['path'][:30]:<30} "
+                         f"{format_size(t['bytes']):>10} {format_rate(t['rate']):>12} {t['seconds']:>6.0f}s")
+        lines.append(f"{Fore.WHITE} 最近事件:")
+        lines.extend(f"   {e}" for e in list(METRICS.events))
+        # 恢复光标并清除其后的内容再重绘
+        sys.stdout.write("\0338\033[J" + "\n".join(lines) + "\n")
+        sys.stdout.flush()
+
 def run_quickserve(args, tools):
     qrcode = tools["qrcode"]
-    port = getattr(args, 'port', 8000)
+    port = getattr(args, 'port', 8000) or 8000
+    max_conn = max(1, getattr(args, 'max_conn', 64) or 64)
+    UploadHandler.timeout = getattr(args, 'keepalive', 15) or 15
+    limit = max(0.0, getattr(args, 'limit', 0) or 0) * 1048576
+    client_limit = max(0.0, getattr(args, 'client_limit', 0) or 0) * 1048576
+    METRICS.configure(limit, client_limit)
+    dashboard = getattr(args, 'dashboard', False)
     
     # 使用新逻辑获取真实 IP
     ip = get_real_ip()
@@ -152,6 +1164,9 @@ def run_quickserve(args, tools):
     print(f"│                🚀 DevBox - QuickServe 运行中               │")
     print(f"└────────────────────────────────────────────────────────────┘")
     print(f" 🔗 访问地址: {url}")
+    print(f" ⚙️  并发连接上限: {max_conn} | keep-alive: {UploadHandler.timeout:g}s | "
+          f"下载: {'sendfile 零拷贝' if hasattr(os, 'sendfile') else '普通拷贝'}")
+    print(f" 📈 统计接口: {url}/metrics")
     print("-" * 62)
     
     qr = qrcode.QRCode(version=1, box_size=1, border=2)
@@ -159,7 +1174,11 @@ def run_quickserve(args, tools):
     qr.make(fit=True)
     qr.print_ascii(invert=True)
     
-    with socketserver.TCPServer(("", port), UploadHandler) as httpd:
+    if dashboard:
+        METRICS.quiet = True
+        threading.Thread(target=dashboard_loop, args=(tools["Fore"],), daemon=True).start()
+
+    with QuickServer(("", port), UploadHandler, max_conn) as httpd:
         try:
             httpd.serve_forever()
         except KeyboardInterrupt: